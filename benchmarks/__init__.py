@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Performance measurements of component_tags.
+
+Every benchmark module can be run on its own, e.g.:
+    python -m benchmarks.render_many
+
+The micro-benchmark suite compared with a baseline (see suite.py):
+    python -m benchmarks
+"""
+import os
+import timeit
+
+import django
+from django.conf import settings
+
+
+def setup(**overrides):
+    """
+    Configure a minimal Django project for the benchmarks.
+    """
+    if settings.configured:
+        return
+    options = dict(
+        DEBUG=False,
+        SECRET_KEY='benchmarks',
+        INSTALLED_APPS=['component_tags'],
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [os.path.join(os.path.dirname(__file__), 'templates')],
+            'APP_DIRS': True,
+        }],
+    )
+    options.update(overrides)
+    settings.configure(**options)
+    django.setup()
+
+
+def measure(func, number=1, repeat=5):
+    """
+    Return the best time in seconds of `repeat` runs of `number` calls.
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def report(title, results):
+    print(title)
+    for label, seconds in results:
+        print('    %-40s %10.3f ms' % (label, seconds * 1000))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Private memory of forked workers with and without component_tags.freeze().
+
+Each run compiles many templates in the master process, forks workers which
+render them and run the garbage collector, and reports the private memory
+(Private_Clean + Private_Dirty) of every worker.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from . import setup
+
+NB_COMPONENTS = 500
+NB_TEMPLATES = 200
+NB_WORKERS = 4
+
+
+def get_private_memory():
+    """
+    Return the private memory of the current process, in kB.
+    """
+    total = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                total += int(line.split()[1])
+    return total
+
+
+def run(frozen):
+    setup()
+
+    import gc
+
+    from django import template
+
+    from component_tags import freeze, warmup
+    from component_tags.arguments import Argument, Flag, KeywordArgument
+    from component_tags.core import Options, Tag
+
+    class Media:
+        template = 'benchmarks/row.html'
+        css = ['/static/row.css']
+        js = []
+
+    library = template.Library()
+    for i in range(NB_COMPONENTS):
+        library.tag(type('Row%sTag' % i, (Tag,), {
+            'name': 'row%s' % i,
+            'Media': Media,
+            'options': Options(
+                Argument('label'),
+                KeywordArgument('count'),
+                Flag('selected'),
+                blocks=[('endrow%s' % i, 'content')],
+            ),
+        }))
+    engine = template.Engine.get_default()
+    engine.template_builtins.append(library)
+
+    templates = []
+    for i in range(NB_TEMPLATES):
+        templates.append(engine.from_string(''.join(
+            '{%% row%s "label" count=%s selected %%}<b>{{ value }}</b>{%% endrow%s %%}' % (j, j, j)
+            for j in range(i % 50, NB_COMPONENTS, 10)
+        )))
+    warmup(engine, template_names=[])
+    if frozen:
+        freeze()
+    else:
+        gc.collect()
+
+    pipes = []
+    for i in range(NB_WORKERS):
+        read_fd, write_fd = os.pipe()
+        if os.fork() == 0:
+            os.close(read_fd)
+            for tpl in templates:
+                tpl.render(template.Context({'value': i}))
+            gc.collect()
+            os.write(write_fd, str(get_private_memory()).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append(read_fd)
+
+    results = []
+    for read_fd in pipes:
+        results.append(int(os.read(read_fd, 64)))
+        os.close(read_fd)
+        os.wait()
+    print(json.dumps(results))
+
+
+def main():
+    print('Private memory of %s forked workers (%s components, %s templates)' % (
+        NB_WORKERS, NB_COMPONENTS, NB_TEMPLATES
+    ))
+    for label, args in (('without freeze()', []), ('with freeze()', ['--freeze'])):
+        output = subprocess.check_output([sys.executable, '-m', 'benchmarks.freeze', '--run'] + args)
+        results = json.loads(output.decode().splitlines()[-1])
+        print('    %-40s %10.0f kB per worker' % (label, sum(results) / len(results)))
+
+
+if __name__ == '__main__':
+    if '--run' in sys.argv:
+        run('--freeze' in sys.argv)
+    else:
+        main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering a tiny component in a 10k rows loop: regular vs inlined template
+(Tag.inline).
+"""
+from . import measure, report, setup
+
+setup()
+
+from django import template  # noqa: E402
+
+from component_tags.arguments import Argument, KeywordArgument  # noqa: E402
+from component_tags.core import Options, Tag  # noqa: E402
+
+
+NB_ROWS = 10000
+
+
+class BadgeTag(Tag):
+    name = 'badge'
+    options = Options(
+        Argument('label'),
+        KeywordArgument('kind', required=False, default="'info'"),
+    )
+
+    class Media:
+        template = 'benchmarks/badge.html'
+        css = []
+        js = []
+
+
+class InlineBadgeTag(BadgeTag):
+    name = 'inline_badge'
+    inline = True
+
+
+def main():
+    library = template.Library()
+    library.tag(BadgeTag)
+    library.tag(InlineBadgeTag)
+    engine = template.Engine.get_default()
+    engine.template_builtins.append(library)
+
+    context = {'rows': ['row %s' % i for i in range(NB_ROWS)]}
+    regular = engine.from_string('{% for row in rows %}{% badge row kind="ok" %}{% endfor %}')
+    inlined = engine.from_string('{% for row in rows %}{% inline_badge row kind="ok" %}{% endfor %}')
+
+    assert regular.render(template.Context(context)) == inlined.render(template.Context(context))
+
+    report('Render %s badges' % NB_ROWS, [
+        ('{% badge %}', measure(lambda: regular.render(template.Context(context)))),
+        ('{% inline_badge %} (inline = True)', measure(lambda: inlined.render(template.Context(context)))),
+    ])
+
+
+if __name__ == '__main__':
+    main()
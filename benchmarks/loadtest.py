@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Load test of the sample project (benchmarks/project) served in-process by a
+threaded WSGI server:
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --components 50 500 --concurrency 8 --duration 10
+    python -m benchmarks.loadtest --mode memo,fragments,inline
+Reports throughput, p50/p95/p99 latency and the RSS of the server process
+for each page size.
+"""
+import argparse
+import http.client
+import resource
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from . import setup
+
+MODES = {
+    # mode -> (middleware, component attributes)
+    'plain': ([], {}),
+    'memo': (['component_tags.memo.MemoMiddleware'], {'BadgeTag': {'memoize': True}}),
+    'fragments': (['component_tags.fragments.FragmentCacheMiddleware'], {'CardTag': {'cacheable': True}}),
+    'inline': ([], {'BadgeTag': {'inline': True}, 'SectionTag': {'inline': True}}),
+    'parallel': ([], {'CardTag': {'parallel': True}}),
+}
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def configure(modes):
+    middleware = []
+    for mode in modes:
+        middleware.extend(MODES[mode][0])
+    setup(
+        ALLOWED_HOSTS=['*'],
+        ROOT_URLCONF='benchmarks.project.urls',
+        MIDDLEWARE=middleware,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [],
+            'APP_DIRS': True,
+            'OPTIONS': {'builtins': ['benchmarks.project.components']},
+        }],
+        INSTALLED_APPS=['component_tags', 'benchmarks'],
+    )
+    from .project import components
+
+    for mode in modes:
+        for class_name, attrs in MODES[mode][1].items():
+            for attr, value in attrs.items():
+                setattr(getattr(components, class_name), attr, value)
+
+
+def get_parallel_cards():
+    """
+    Return the cards of the page rendered in the thread pool in the parallel
+    mode: the parallel nodes of the section blocks, within {% for %}.
+    """
+    from django.template.loader import get_template
+
+    from component_tags.parallel import ParallelNodeList
+
+    from .project.components import CardTag, SectionTag
+
+    cards = []
+    for section in get_template('project/page.html').template.nodelist.get_nodes_by_type(SectionTag):
+        content = section.blocks['content']
+        if isinstance(content, ParallelNodeList):
+            cards.extend(node for node in content.parallel_nodes if isinstance(node, CardTag))
+    return cards
+
+
+def get_rss():
+    """
+    Return the current and the peak resident set size of the process, in bytes.
+    """
+    current = 0
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:  # pragma: no cover
+        pass
+    # kilobytes on Linux
+    return current, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def load(port, path, concurrency, duration):
+    """
+    Request path from concurrency threads during duration seconds, return
+    the latencies and the number of errors.
+    """
+    latencies = []
+    errors = [0]
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+
+    def client():
+        own = []
+        own_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status != 200:
+                    own_errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                own_errors += 1
+                continue
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+            errors[0] += own_errors
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--components', type=int, nargs='+', default=[50, 200, 500], help="Components per page.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent clients (default: %(default)s).")
+    parser.add_argument('--duration', type=float, default=5, help="Seconds per page size (default: %(default)s).")
+    parser.add_argument('--warmup', type=int, default=20, help="Requests before measuring (default: %(default)s).")
+    parser.add_argument('--mode', default='plain', help="Comma separated modes: %s." % ', '.join(sorted(MODES)))
+    options = parser.parse_args(argv)
+
+    modes = [mode for mode in options.mode.split(',') if mode]
+    for mode in modes:
+        if mode not in MODES:
+            parser.error("unknown mode '%s'" % mode)
+    configure(modes)
+    if 'parallel' in modes and not get_parallel_cards():
+        parser.error("the cards of the page are not rendered in parallel")
+
+    from django.core.wsgi import get_wsgi_application
+
+    server = make_server(
+        '127.0.0.1', 0, get_wsgi_application(), server_class=ThreadingWSGIServer, handler_class=QuietHandler
+    )
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    print('Load test, mode %s, %d clients, %.0fs per page' % ('+'.join(modes), options.concurrency, options.duration))
+    print('    %-12s %10s %10s %10s %10s %8s %12s %12s' % (
+        'components', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors', 'RSS MB', 'peak RSS MB'
+    ))
+    try:
+        for count in options.components:
+            path = '/page/%d/' % count
+            for _ in range(options.warmup):
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                connection.request('GET', path)
+                connection.getresponse().read()
+                connection.close()
+            load_start = time.perf_counter()
+            latencies, errors = load(port, path, options.concurrency, options.duration)
+            elapsed = time.perf_counter() - load_start
+            rss, peak_rss = get_rss()
+            print('    %-12d %10.1f %10.2f %10.2f %10.2f %8d %12.1f %12.1f' % (
+                count, len(latencies) / elapsed,
+                percentile(latencies, 0.50) * 1000, percentile(latencies, 0.95) * 1000,
+                percentile(latencies, 0.99) * 1000, errors, rss / 1e6, peak_rss / 1e6,
+            ))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Memory allocated by compiled component nodes, measured with tracemalloc.
+"""
+import tracemalloc
+
+from . import setup
+
+setup()
+
+from django import template  # noqa: E402
+
+from component_tags.arguments import Argument, Flag, KeywordArgument  # noqa: E402
+from component_tags.core import Options, Tag  # noqa: E402
+from component_tags.values import IntegerValue, StringValue  # noqa: E402
+
+NB_NODES = 20000
+
+
+class RowTag(Tag):
+    name = 'row'
+    options = Options(
+        Argument('label', value_class=StringValue),
+        KeywordArgument('count', value_class=IntegerValue),
+        KeywordArgument('size', choices=['small', 'large']),
+        Flag('selected'),
+        blocks=[('middle', 'before'), ('endrow', 'after')],
+    )
+
+    class Media:
+        template = 'benchmarks/row.html'
+        css = []
+        js = []
+
+
+def main():
+    library = template.Library()
+    library.tag(RowTag)
+    engine = template.Engine.get_default()
+    engine.template_builtins.append(library)
+
+    source = '{% row item.label count=item.count size="small" selected %}a{% middle %}b{% endrow %}' * 100
+    # Compile once so that lazily built objects are not measured.
+    engine.from_string(source)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    templates = [engine.from_string(source) for i in range(NB_NODES // 100)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print('Memory of %s compiled component nodes' % NB_NODES)
+    print('    %-40s %10.1f kB' % ('total', size / 1024.0))
+    print('    %-40s %10.0f B' % ('per node', size / float(NB_NODES)))
+    return templates
+
+
+if __name__ == '__main__':
+    main()
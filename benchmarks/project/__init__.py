@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+Sample component-heavy project driven by benchmarks.loadtest.
+"""
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Components of the sample project, available in every template (builtins).
+"""
+from django import template
+
+from component_tags.arguments import Argument, KeywordArgument
+from component_tags.core import Options, Tag
+from component_tags.values import IntegerValue
+
+register = template.Library()
+
+
+class LayoutTag(Tag):
+    name = 'layout'
+    options = Options(
+        Argument('title'),
+        blocks=[('sidebar', 'content'), ('endlayout', 'sidebar')],
+    )
+
+    class Media:
+        template = 'project/layout.html'
+        css = ['/static/layout.css']
+        js = ['/static/layout.js']
+
+
+class SectionTag(Tag):
+    name = 'section'
+    options = Options(
+        Argument('title'),
+        blocks=[('endsection', 'content')],
+    )
+
+    class Media:
+        template = 'project/section.html'
+        css = ['/static/section.css']
+        js = []
+
+
+class CardTag(Tag):
+    name = 'card'
+    options = Options(
+        Argument('label'),
+        KeywordArgument('price', value_class=IntegerValue, required=False, default='0'),
+        KeywordArgument('size', choices=['small', 'large'], required=False, default="'small'"),
+        blocks=[('endcard', 'content')],
+    )
+
+    class Media:
+        template = 'project/card.html'
+        css = ['/static/card.css']
+        js = ['/static/card.js']
+
+
+class BadgeTag(Tag):
+    name = 'badge'
+    options = Options(
+        Argument('kind'),
+    )
+
+    class Media:
+        template = 'project/badge.html'
+        css = ['/static/badge.css']
+        js = []
+
+
+for component_class in (LayoutTag, SectionTag, CardTag, BadgeTag):
+    register.tag(component_class)
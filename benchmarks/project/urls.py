@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('page/<int:count>/', views.page),
+]
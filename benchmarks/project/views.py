@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from django.template.response import TemplateResponse
+
+ITEMS_PER_SECTION = 10
+
+
+def page(request, count):
+    """
+    Page of about `count` components: a card and a badge per item, a section
+    per ITEMS_PER_SECTION items.
+    """
+    nb_items = max(1, count // 2)
+    items = [
+        {'label': 'Item %s' % i, 'price': i * 10, 'kind': ['new', 'sale', 'hot'][i % 3], 'large': i % 7 == 0}
+        for i in range(nb_items)
+    ]
+    sections = [
+        {'title': 'Section %s' % (i // ITEMS_PER_SECTION), 'items': items[i:i + ITEMS_PER_SECTION]}
+        for i in range(0, nb_items, ITEMS_PER_SECTION)
+    ]
+    return TemplateResponse(request, 'project/page.html', {'title': 'Catalog', 'sections': sections})
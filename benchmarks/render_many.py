@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering a component for each of 10k rows: {% for %} loop vs loop tag vs
+Tag.render_many vs Tag.render_rows.
+"""
+from . import measure, report, setup
+
+setup()
+
+from django import template  # noqa: E402
+
+from component_tags.arguments import Argument, Flag, KeywordArgument  # noqa: E402
+from component_tags.core import Options, Tag  # noqa: E402
+
+
+NB_ROWS = 10000
+
+
+class RowTag(Tag):
+    name = 'row'
+    options = Options(
+        Argument('label'),
+        KeywordArgument('count', required=False, default='0'),
+        Flag('selected'),
+    )
+
+    class Media:
+        template = 'benchmarks/row.html'
+        css = []
+        js = []
+
+
+def main():
+    library = template.Library()
+    library.tag(RowTag)
+    library.tag(RowTag.for_tag())
+    engine = template.Engine.get_default()
+    engine.template_builtins.append(library)
+
+    rows = [{'label': 'row %s' % i, 'count': i, 'selected': i % 2 == 0} for i in range(NB_ROWS)]
+    # rows without count use the default of the argument
+    for row in rows[::10]:
+        del row['count']
+    # render_rows takes resolved arguments, defaults included
+    resolved_rows = [dict({'count': 0}, **row) for row in rows]
+    context = {'rows': rows}
+    loop = engine.from_string(
+        "{% for row in rows %}{% row row.label count=row.count|default:'0' selected=row.selected %}{% endfor %}"
+    )
+    loop_tag = engine.from_string(
+        "{% row_for rows as row row.label count=row.count|default:'0' selected=row.selected %}"
+    )
+
+    assert loop.render(template.Context(context)) == loop_tag.render(template.Context(context))
+    assert loop_tag.render(template.Context(context)) == RowTag.render_many(rows)
+    assert RowTag.render_many(rows) == RowTag.render_rows(resolved_rows)
+
+    report('Render %s rows' % NB_ROWS, [
+        ('{% for %} + {% row %}', measure(lambda: loop.render(template.Context(context)))),
+        ('{% row_for %}', measure(lambda: loop_tag.render(template.Context(context)))),
+        ('RowTag.render_many', measure(lambda: RowTag.render_many(rows))),
+        ('RowTag.render_rows', measure(lambda: RowTag.render_rows(resolved_rows))),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks of parsing, rendering, value cleaning and dependency
+emission, compared with a baseline:
+    python -m benchmarks                 # run, compare with benchmarks/baseline.json
+    python -m benchmarks --save          # run and store the baseline
+    python -m benchmarks --threshold 0.1 render
+Exits with status 1 when a benchmark is slower than the baseline by more
+than the threshold (default 20%). Baselines are specific to a machine.
+"""
+import argparse
+import json
+import os
+import sys
+
+from . import measure, setup
+
+setup()
+
+from django import template  # noqa: E402
+
+from component_tags import values  # noqa: E402
+from component_tags.arguments import KeywordArgument  # noqa: E402
+from component_tags.core import Options, Tag  # noqa: E402
+from component_tags.utils import TemplateConstant  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+NB_TAGS = 50
+NB_CALLS = 10000
+
+benchmarks = []
+library = template.Library()
+
+
+def benchmark(name, number=1):
+    """
+    Register a benchmark: the decorated function prepares the case and
+    returns the callable to measure, called `number` times per run.
+    """
+    def decorator(func):
+        benchmarks.append((name, func, number))
+        return func
+    return decorator
+
+
+def make_tag(name, nb_arguments=0, nb_blocks=0, media=None):
+    blocks = [('%s_block%s' % (name, i), 'block%s' % i) for i in range(1, nb_blocks)]
+    if nb_blocks:
+        blocks.append(('end%s' % name, 'block%s' % nb_blocks))
+    attrs = {
+        'name': name,
+        'options': Options(
+            *[KeywordArgument('arg%s' % i, required=False) for i in range(nb_arguments)],
+            blocks=blocks
+        ),
+        'render_tag': lambda self, context, **kwargs: '',
+    }
+    if media:
+        attrs['Media'] = media
+    tag_class = type(str(name), (Tag,), attrs)
+    library.tag(tag_class)
+    return tag_class
+
+
+def tag_source(name, nb_arguments=0, nb_blocks=0, value='1'):
+    bits = [name] + ['arg%s=%s' % (i, value) for i in range(nb_arguments)]
+    source = '{% ' + ' '.join(bits) + ' %}'
+    for i in range(1, nb_blocks):
+        source += 'b{%% %s_block%s %%}' % (name, i)
+    if nb_blocks:
+        source += 'b{%% end%s %%}' % name
+    return source
+
+
+def compile(source):
+    return template.Engine.get_default().from_string(source)
+
+
+for count in (1, 4, 16):
+    make_tag('args%s' % count, nb_arguments=count)
+    make_tag('blocks%s' % count, nb_blocks=count)
+
+    @benchmark('parse: %s arguments x%s' % (count, NB_TAGS))
+    def parse_arguments(count=count):
+        source = tag_source('args%s' % count, nb_arguments=count) * NB_TAGS
+        return lambda: compile(source)
+
+    @benchmark('parse: %s blocks x%s' % (count, NB_TAGS))
+    def parse_blocks(count=count):
+        source = tag_source('blocks%s' % count, nb_blocks=count) * NB_TAGS
+        return lambda: compile(source)
+
+
+make_tag('render', nb_arguments=4, nb_blocks=1)
+make_tag('nested', nb_blocks=1)
+
+
+@benchmark('render: constant arguments x%s' % NB_TAGS)
+def render_constant():
+    tpl = compile(tag_source('render', nb_arguments=4, nb_blocks=1, value="'foo'") * NB_TAGS)
+    return lambda: tpl.render(template.Context())
+
+
+@benchmark('render: dynamic arguments x%s' % NB_TAGS)
+def render_dynamic():
+    tpl = compile(tag_source('render', nb_arguments=4, nb_blocks=1, value='item.value') * NB_TAGS)
+    context = {'item': {'value': 'foo'}}
+    return lambda: tpl.render(template.Context(context))
+
+
+@benchmark('render: blocks nested %s deep' % NB_TAGS)
+def render_nested():
+    tpl = compile('{% nested %}' * NB_TAGS + 'b' + '{% endnested %}' * NB_TAGS)
+    return lambda: tpl.render(template.Context())
+
+
+CLEAN_CASES = [
+    ('Value', values.Value, 'foo'),
+    ('StringValue', values.StringValue, 12),
+    ('StrictStringValue', values.StrictStringValue, 'foo'),
+    ('IntegerValue', values.IntegerValue, '12'),
+    ('BooleanValue', values.BooleanValue, 1),
+    ('FloatValue', values.FloatValue, '1.5'),
+    ('IterableValue', values.IterableValue, [1, 2]),
+    ('ListValue', values.ListValue, [1, 2]),
+    ('DictValue', values.DictValue, {'a': 1}),
+    ('ChoiceValue', KeywordArgument('choice', choices=['a', 'b']).value_class, 'b'),
+]
+
+for label, value_class, raw in CLEAN_CASES:
+    @benchmark('%s.clean' % label, number=NB_CALLS)
+    def clean(value_class=value_class, raw=raw):
+        value = value_class(TemplateConstant(raw))
+        return lambda: value.clean(raw)
+
+
+@benchmark('TemplateConstant.resolve', number=NB_CALLS)
+def resolve_constant():
+    constant = TemplateConstant("'foo'")
+    context = template.Context({'bar': 1})
+    return lambda: constant.resolve(context)
+
+
+@benchmark('dependencies: %s components' % NB_TAGS)
+def dependencies():
+    source = '{% load component_tags %}{% dependencies %}'
+    for i in range(NB_TAGS):
+        media = type('Media', (object,), {
+            'template': None, 'css': ['/css/%s.css' % i, '/css/common.css'], 'js': ['/js/%s.js' % i],
+        })
+        make_tag('dependency%s' % i, media=media)
+        source += '{%% dependency%s %%}' % i
+    tpl = compile(source)
+    return lambda: tpl.render(template.Context())
+
+
+def run(selected=None):
+    engine = template.Engine.get_default()
+    if library not in engine.template_builtins:
+        engine.template_builtins.append(library)
+    results = {}
+    for name, func, number in benchmarks:
+        if selected and not any(word in name for word in selected):
+            continue
+        results[name] = measure(func(), number=number)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the results and return the names of the benchmarks slower than the
+    baseline by more than threshold.
+    """
+    regressions = []
+    for name, seconds in results.items():
+        line = '    %-45s %12.3f us' % (name, seconds * 1e6)
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += '  %+7.1f%%' % (change * 100)
+            if change > threshold:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('selected', nargs='*', help="Only run the benchmarks whose name contains one of these words.")
+    parser.add_argument('--baseline', default=BASELINE, help="Baseline file (default: %(default)s).")
+    parser.add_argument('--save', action='store_true', help="Store the results as the baseline.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Tolerated slowdown (default: %(default)s).")
+    options = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+
+    results = run(options.selected)
+    print('Micro-benchmarks (best time per call)')
+    regressions = compare(results, baseline, options.threshold)
+
+    if options.save:
+        baseline.update(results)
+        with open(options.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print('Baseline saved to %s' % options.baseline)
+    elif regressions:
+        print('%d regression(s) above %d%%' % (len(regressions), options.threshold * 100))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
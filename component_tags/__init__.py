@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+__version__ = '0.1.0'
+
+from .precompile import freeze, warmup  # noqa: E402,F401
@@ -2,14 +2,16 @@
 from django import template
 from .exceptions import DuplicateArgument
 
-from .utils import TemplateConstant, mixin
+from .utils import Freezable, TemplateConstant, mixin
 from .values import BooleanValue, ChoiceValue, Value
 
 
-class Argument(object):
+class Argument(Freezable):
     """
     A basic single value argument.
     """
+    __slots__ = ('name', 'value_class', 'default', 'required', 'resolve', '_frozen')
+
     def __init__(self, name, value_class=Value, default=None, required=True, resolve=True):
         self.name = name
         self.value_class = value_class
@@ -39,6 +41,8 @@ class Argument(object):
 
 
 class KeywordArgument(Argument):
+    __slots__ = ()
+
     def __init__(self, name, choices=None, value_class=Value, default=None, required=True, resolve=True):
         super(KeywordArgument, self).__init__(name, value_class=value_class, default=default, required=required, resolve=resolve)
         if choices:
@@ -50,6 +54,7 @@ class KeywordArgument(Argument):
                 self.value_class,
                 ChoiceValue,
                 attrs={
+                    '__slots__': (),
                     'choices': choices,
                     'value_on_error': value_on_error,
                 }
@@ -60,5 +65,7 @@ class Flag(KeywordArgument):
     """
     A boolean flag
     """
+    __slots__ = ()
+
     def __init__(self, name):
         super(Flag, self).__init__(name, choices=[False, True], value_class=BooleanValue, default=False, required=False)
\ No newline at end of file
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Template library of the components of the installed apps, found in their
+COMPONENT_TAGS_AUTODISCOVER_MODULE module ('components' by default) and
+imported the first time one of their tags is parsed:
+    'OPTIONS': {'builtins': ['component_tags.autodiscover']}
+
+The tags of the modules are listed once in the JSON index
+COMPONENT_TAGS_AUTODISCOVER_INDEX (in the temporary directory by default),
+built again when a module changes, so that the workers start without
+importing them. The index is read the first time a template is compiled.
+Only the tags of the modules are available, load their filters with
+{% load %}.
+"""
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import warnings
+
+from django import template
+from django.apps import apps
+from django.conf import settings
+
+import component_tags
+
+from .core import Tag
+
+
+def get_module_name():
+    return getattr(settings, 'COMPONENT_TAGS_AUTODISCOVER_MODULE', 'components')
+
+
+def get_index_path():
+    path = getattr(settings, 'COMPONENT_TAGS_AUTODISCOVER_INDEX', None)
+    if path is None:
+        # one index per project and environment
+        key = ' '.join([sys.prefix] + [app_config.name for app_config in apps.get_app_configs()])
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()[:12]
+        path = os.path.join(tempfile.gettempdir(), 'component_tags-index-%s.json' % digest)
+    return path
+
+
+def find_modules():
+    """
+    Return the modification time of the component module of each installed
+    app, by module name, without importing them.
+    """
+    modules = {}
+    for app_config in apps.get_app_configs():
+        module_name = '%s.%s' % (app_config.name, get_module_name())
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except ImportError:
+            continue
+        if spec is None or not spec.origin or not os.path.exists(spec.origin):
+            continue
+        modules[module_name] = os.stat(spec.origin).st_mtime
+    return modules
+
+
+def get_module_tags(module):
+    """
+    Return the component classes of a module by tag name: the components
+    of its template library (register), else the Tag subclasses it defines.
+    """
+    library = getattr(module, 'register', None)
+    if isinstance(library, template.Library):
+        return dict(
+            (name, func) for name, func in library.tags.items()
+            if isinstance(func, type) and issubclass(func, Tag)
+        )
+    return dict(
+        (value.name, value) for value in vars(module).values()
+        if isinstance(value, type) and issubclass(value, Tag) and value.__module__ == module.__name__ and value.name
+    )
+
+
+def build_index(modules):
+    """
+    Import the modules and return the index of their components: tag name ->
+    module.
+    """
+    tags = {}
+    for module_name in sorted(modules):
+        module = importlib.import_module(module_name)
+        for name in sorted(get_module_tags(module)):
+            tags.setdefault(name, {'module': module_name})
+    return tags
+
+
+def read_index(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(path, index):
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    except OSError as e:
+        warn_unsaved(path, e)
+        return
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        os.remove(tmp_path)
+        warn_unsaved(path, e)
+
+
+def warn_unsaved(path, error):
+    warnings.warn(
+        "The index of the components could not be written to %s (%s): each process imports all the component "
+        "modules. Set COMPONENT_TAGS_AUTODISCOVER_INDEX to a writable path." % (path, error),
+        RuntimeWarning,
+    )
+
+
+def get_index(path=None, rebuild=False):
+    """
+    Return the index of the components of the installed apps, read from
+    path (COMPONENT_TAGS_AUTODISCOVER_INDEX) unless a module changed or
+    rebuild is set.
+    """
+    path = path or get_index_path()
+    modules = find_modules()
+    index = None if rebuild else read_index(path)
+    if index is None or index.get('version') != component_tags.__version__ or index.get('modules') != modules:
+        index = {'version': component_tags.__version__, 'modules': modules, 'tags': build_index(modules)}
+        write_index(path, index)
+    return index
+
+
+class LazyTag(object):
+    """
+    Compile function of a component whose module is imported on first use.
+    """
+    def __init__(self, library, name, module_name):
+        self.library = library
+        self.name = name
+        self.module_name = module_name
+        self.component_class = None
+        self.lock = threading.Lock()
+
+    def __repr__(self):  # pragma: no cover
+        return '<LazyTag: %s from %s>' % (self.name, self.module_name)
+
+    def load(self):
+        if self.component_class is None:
+            with self.lock:
+                if self.component_class is None:
+                    component_class = self.find_component()
+                    # later parsers use the component directly
+                    self.library.tags[self.name] = component_class
+                    self.component_class = component_class
+        return self.component_class
+
+    def find_component(self):
+        tags = get_module_tags(importlib.import_module(self.module_name))
+        if self.name not in tags:
+            # stale index: the component moved or was removed since it was built
+            entry = self.library.rebuild_index()['tags'].get(self.name)
+            if entry is None:
+                raise template.TemplateSyntaxError(
+                    "Component tag '%s' is no longer defined in %s." % (self.name, self.module_name)
+                )
+            self.module_name = entry['module']
+            tags = get_module_tags(importlib.import_module(self.module_name))
+        return tags[self.name]
+
+    def __call__(self, parser, token):
+        return self.load()(parser, token)
+
+
+class ComponentLibrary(template.Library):
+    """
+    Template library holding a LazyTag for each indexed component. The
+    index is read the first time the tags are looked up (by the parser of
+    the first template compiled).
+    """
+    def __init__(self, index=None):
+        super(ComponentLibrary, self).__init__()
+        self.index = index
+        self.rebuilt = False
+        self.lock = threading.Lock()
+        self._tags = None
+
+    @property
+    def tags(self):
+        if self._tags is None:
+            with self.lock:
+                if self._tags is None:
+                    if self.index is None:
+                        self.index = get_index()
+                    self._tags = dict(
+                        (name, LazyTag(self, name, entry['module'])) for name, entry in self.index['tags'].items()
+                    )
+        return self._tags
+
+    @tags.setter
+    def tags(self, tags):
+        # set to {} by template.Library
+        self._tags = tags or None
+
+    def rebuild_index(self):
+        with self.lock:
+            if not self.rebuilt:
+                self.index = get_index(rebuild=True)
+                self.rebuilt = True
+        return self.index
+
+
+register = ComponentLibrary()
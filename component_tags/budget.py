@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.db import close_old_connections
+from django.template.loader import get_template
+from django.utils.safestring import SafeText
+
+from . import fragments, parallel
+from .utils import StripedCounter
+
+DEFAULT_WORKERS = 8
+
+# component name -> number of renders which exceeded render_timeout
+timeouts = StripedCounter()
+# component name -> number of renders not started, all the threads being busy
+dropped = StripedCounter()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class Fallback(SafeText):
+    """
+    Fallback output of a component which exceeded its render_timeout. The
+    render goes on in the background, future holds its output.
+    """
+    future = None
+
+
+def render_fallback(node, kwargs):
+    if node.fallback_template is None:
+        return ''
+    return get_template(node.fallback_template).render(kwargs)
+
+
+def get_executor():
+    """
+    Return the thread pool of the budgeted renders, shared by the process,
+    and the semaphore counting its free threads. None when budgets are
+    disabled (COMPONENT_TAGS_BUDGET_WORKERS = 0).
+    """
+    global _executor
+    workers = getattr(settings, 'COMPONENT_TAGS_BUDGET_WORKERS', DEFAULT_WORKERS)
+    if not workers:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = (
+                    ThreadPoolExecutor(max_workers=workers, thread_name_prefix='component_tags-budget'),
+                    threading.BoundedSemaphore(workers),
+                )
+    return _executor
+
+
+def render(node, context, kwargs):
+    """
+    Render the node in the thread pool and wait at most node.render_timeout
+    seconds for its output, then return its fallback. Renders past their
+    budget keep their thread until they complete: when all the threads are
+    busy, the fallback is returned at once.
+    """
+    executor = get_executor()
+    if executor is None:
+        return node.render_content(context, kwargs)
+    executor, free_threads = executor
+    if not free_threads.acquire(False):
+        dropped.add(node.name)
+        timeouts.add(node.name)
+        return Fallback(render_fallback(node, kwargs))
+
+    # the render may go on past its budget: its variables are not shared
+    # with the page
+    node_context = parallel.snapshot(context)
+
+    def run():
+        # the output must not depend on the fragment batch of the page
+        fragments._batch.set(None)
+        close_old_connections()
+        try:
+            return node.render_content(node_context, kwargs)
+        finally:
+            close_old_connections()
+            free_threads.release()
+
+    try:
+        future = executor.submit(contextvars.copy_context().run, run)
+    except BaseException:
+        free_threads.release()
+        raise
+    try:
+        return future.result(node.render_timeout)
+    except TimeoutError:
+        timeouts.add(node.name)
+        output = Fallback(render_fallback(node, kwargs))
+        output.future = future
+        return output
+
+
+def get_timeout_stats():
+    """
+    Return the number of renders which exceeded their budget by component
+    name.
+    """
+    return dict(timeouts.snapshot())
+
+
+def get_dropped_stats():
+    """
+    Return the number of renders replaced by their fallback without being
+    started, all the threads of the pool being busy, by component name.
+    """
+    return dict(dropped.snapshot())
@@ -1,18 +1,31 @@
 # -*- coding: utf-8 -*-
+import contextvars
+import hashlib
+from contextlib import contextmanager
 from operator import attrgetter
 
-from django.template import Node
-from django.template.loader import render_to_string
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Node, TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.context import BaseContext
+from django.template.base import Token
+from django.template.loader import get_template
+from django.template.loader_tags import ExtendsNode, IncludeNode
 from django.utils import six
+from django.utils.safestring import mark_safe
 
 from .arguments import Argument
 from .blocks import BlockDefinition
+from .exceptions import LoopSyntaxError
+from . import budget, deferred, fragments, memo, parallel, profiling, tracing
+from .parallel import parallelize
 from .parser import Parser
-from .utils import get_default_name
+from .utils import Freezable, get_default_name, mixin
 from .registry import ComponentRegistry
 
 
-class Options(object):
+class Options(Freezable):
     """
     Option class holding the arguments of a tag.
     """
@@ -45,6 +58,35 @@ class Options(object):
     def get_parser_class(self):
         return self.parser_class
 
+    def freeze(self):
+        """
+        Store the definitions in tuples and reject later changes.
+        """
+        if getattr(self, '_frozen', False):
+            return
+        self._options = tuple(self._options)
+        self.arguments = tuple(self.arguments)
+        self.all_argument_names = tuple(self.all_argument_names)
+        self.blocks = tuple(self.blocks)
+        for argument in self.arguments:
+            argument.freeze()
+        super(Options, self).freeze()
+
+    def fingerprint(self):
+        """
+        Return a digest of the arguments and blocks definitions. Templates
+        compiled with other definitions must be compiled again.
+        """
+        data = []
+        for a in self.arguments:
+            data.append((
+                a.__class__.__name__, a.name, a.value_class.__name__,
+                getattr(a.value_class, 'choices', None), a.default, a.required, a.resolve,
+            ))
+        for block in self.blocks:
+            data.append((block.alias, block.names))
+        return hashlib.sha1(repr(data).encode('utf-8')).hexdigest()
+
     def parse(self, parser, tokens):
         """
         Parse template tokens into a dictionary
@@ -53,6 +95,24 @@ class Options(object):
         argument_parser = argument_parser_class(self)
         return argument_parser.parse(parser, tokens)
 
+    def parse_values(self, tagname, values):
+        """
+        Build the arguments and blocks from a dictionary of Python values
+        """
+        argument_parser_class = self.get_parser_class()
+        argument_parser = argument_parser_class(self)
+        return argument_parser.parse_values(tagname, values)
+
+
+
+def get_template_from_string(source):
+    """
+    Compile source with the first Django template engine.
+    """
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates):
+            return engine.from_string(source)
+    raise ImproperlyConfigured("No DjangoTemplates backend is configured.")
 
 
 class TagMeta(type):
@@ -73,7 +133,40 @@ class TagMeta(type):
         fake_func.__name__ = tag_name
         attrs['_decorated_function'] = fake_func
         attrs['name'] = str(tag_name)
-        return super(TagMeta, cls).__new__(cls, name, bases, attrs)
+        if 'cache_models' in attrs:
+            attrs['_cache_models'] = fragments.watch(attrs['cache_models'])
+        klass = super(TagMeta, cls).__new__(cls, name, bases, attrs)
+        if '_plain_render' not in attrs:
+            klass._plain_render = not klass.has_render_features()
+        return klass
+
+    def __setattr__(cls, name, value):
+        super(TagMeta, cls).__setattr__(name, value)
+        if name in RENDER_ATTRIBUTES:
+            update_render_path(cls)
+
+    def __delattr__(cls, name):
+        super(TagMeta, cls).__delattr__(name)
+        if name in RENDER_ATTRIBUTES:
+            update_render_path(cls)
+
+
+# options and methods of the components selecting their render path
+RENDER_OPTIONS = ('parallel', 'memoize', 'cacheable', 'render_timeout', 'deferred')
+RENDER_METHODS = ('get_render_kwargs', 'render_kwargs', 'render_resolved', 'render_output', 'render_content')
+RENDER_ATTRIBUTES = RENDER_OPTIONS + RENDER_METHODS
+
+
+def update_render_path(component_class):
+    """
+    Select the render path of the class and of its subclasses again, after
+    one of their RENDER_ATTRIBUTES changed.
+    """
+    classes = [component_class]
+    while classes:
+        klass = classes.pop()
+        type.__setattr__(klass, '_plain_render', not klass.has_render_features())
+        classes.extend(klass.__subclasses__())
 
 
 class Tag(TagMeta('TagMeta', (Node,), {})):
@@ -82,42 +175,294 @@ class Tag(TagMeta('TagMeta', (Node,), {})):
     """
     class Media:
         template = None
+        # source of the template, instead of a template path
+        template_string = None
         css = []
         js = []
+        # snippets output by {% dependencies %} in a single <style> and a
+        # single <script> per page
+        inline_css = None
+        inline_js = None
     
     CSS_TEMPLATE = '<link href="{}" type="text/css" rel="stylesheet" />'
     JS_TEMPLATE = '<script type="text/javascript" src="{}"></script>'
+    INLINE_CSS_TEMPLATE = '<style type="text/css">\n{}\n</style>'
+    INLINE_JS_TEMPLATE = '<script type="text/javascript">\n{}\n</script>'
 
     options = Options()
     name = None
+    # Set to True for thread-safe components which can be rendered in the
+    # thread pool, concurrently with the parallel components of the same
+    # block or {% parallel %} block.
+    parallel = False
+    # Set to True for components whose output only depends on their
+    # arguments and blocks: the output is reused for identical arguments
+    # within a memo scope (see memo.MemoMiddleware).
+    memoize = False
+    # Set to True to keep the output of the component in the cache
+    # COMPONENT_TAGS_CACHE for cache_timeout seconds (see fragments).
+    cacheable = False
+    cache_timeout = 300
+    # Seconds after cache_timeout during which the previous output is served
+    # while a background thread renders the component again.
+    cache_stale_timeout = 0
+    # Outputs of at least this number of bytes are stored zlib-compressed,
+    # defaults to COMPONENT_TAGS_CACHE_COMPRESS_THRESHOLD (None: never).
+    cache_compress_threshold = None
+    # Models the output depends on: 'app_label.ModelName' or a model class,
+    # or a (model, argument name) pair when the argument is the instance (or
+    # its pk). Saving or deleting an instance invalidates the fragments.
+    cache_models = ()
+    _cache_models = ()
+    # Seconds the page waits for the output of the component. Past this
+    # budget, fallback_template (rendered with the arguments) or '' is output
+    # instead. With render_timeout_warm, the output of a cacheable component
+    # is still stored in the cache when its render completes.
+    render_timeout = None
+    fallback_template = None
+    render_timeout_warm = False
+    # Set to True to output a placeholder (holding fallback_template) which
+    # the browser replaces by the output of the component, fetched from the
+    # view of component_tags.urls.
+    deferred = False
+    # Set to True for small components rendered with their template:
+    # the compiled template is spliced into the templates using the
+    # component and rendered without a template boundary (not in DEBUG).
+    inline = False
+    # set by TagMeta: True when none of the options above which change the
+    # render path is used, Tag.render then calls render_tag directly
+    _plain_render = True
 
     def __init__(self, parser, tokens):
         self.kwargs, self.blocks = self.options.parse(parser, tokens)
-        self.child_nodelists = []
         for key, value in self.blocks.items():
-            setattr(self, key, value)
-            self.child_nodelists.append(key)
+            self.blocks[key] = parallelize(value)
+        if self.inline and not settings.DEBUG and type(self).render_tag is Tag.render_tag:
+            self.inline_nodelist = self.get_template().template.nodelist
         if not self.name in registry._registry.keys():
             registry.register(self)
 
+    @property
+    def child_nodelists(self):
+        if 'inline_nodelist' in self.__dict__:
+            return tuple(self.blocks) + ('inline_nodelist',)
+        return tuple(self.blocks)
+
+    def __getattr__(self, name):
+        # The nodelists of the blocks are available as attributes.
+        blocks = self.__dict__.get('blocks')
+        if blocks is not None and name in blocks:
+            return blocks[name]
+        raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
+
     def render(self, context):
         """
         INTERNAL method to prepare rendering
         Usually you should not override this method, but rather use render_tag.
         """
+        if self._plain_render and not profiling.instrumented:
+            kwargs = dict([(key, value.resolve(context)) for key, value in self.kwargs.items()])
+            for key, value in self.blocks.items():
+                kwargs[key] = value.render(context)
+            return self.render_tag(context, **kwargs)
+        if self.parallel:
+            scope = parallel.get_scope()
+            if scope is not None and self in scope.nodes:
+                return scope.submit(self, context)
+        if tracing.enabled:
+            return tracing.render(self, context)
+        if profiling.enabled:
+            return profiling.render(self, context)
+        return self.render_kwargs(context, self.get_render_kwargs(context))
+
+    @classmethod
+    def has_render_features(cls):
+        """
+        Return whether the component renders through render_kwargs: an
+        option changing its render path is set, or a method of the path is
+        overridden.
+        """
+        if cls.parallel or cls.memoize or cls.cacheable or cls.deferred or cls.render_timeout is not None:
+            return True
+        return any(getattr(cls, name) is not getattr(Tag, name) for name in RENDER_METHODS)
+
+    def render_kwargs(self, context, kwargs):
+        """
+        Render the tag, or its deferred placeholder, from its resolved
+        arguments.
+        """
+        if self.deferred:
+            return deferred.render_placeholder(self, context, kwargs)
+        return self.render_resolved(context, kwargs)
+
+    def render_resolved(self, context, kwargs):
+        """
+        Render the tag from its resolved arguments, through the fragment cache.
+        """
+        if self.cacheable:
+            return fragments.render(self, context, kwargs)
+        return self.render_output(context, kwargs)
+
+    def render_output(self, context, kwargs):
+        """
+        Render the tag from its resolved arguments, within its time budget.
+        """
+        if self.render_timeout is not None:
+            return budget.render(self, context, kwargs)
+        return self.render_content(context, kwargs)
+
+    def render_content(self, context, kwargs):
+        """
+        Render the tag from its resolved arguments.
+        """
+        if self.memoize:
+            return memo.render(self, context, kwargs)
+        return self.render_tag(context, **kwargs)
+
+    def get_render_kwargs(self, context):
+        """
+        Resolve the arguments and render the blocks of the tag.
+        """
         items = self.kwargs.items()
         blocks = self.blocks.items()
         kwargs = dict([(key, value.resolve(context)) for key, value in items])
-        kwargs.update(self.blocks)
         for key, value in blocks:
             kwargs[key] = value.render(context)
-        return self.render_tag(context, **kwargs)
+        return kwargs
 
     def render_tag(self, context, **kwargs):
         """
         The method you could override in your component tags
         """
-        return render_to_string(self.Media.template, kwargs)
+        inline_nodelist = self.__dict__.get('inline_nodelist')
+        if inline_nodelist is not None:
+            # same isolation as a template of its own: the arguments only and
+            # a fresh render context
+            component_context = Context(kwargs, context.autoescape, context.use_l10n, context.use_tz)
+            component_context.template = context.template
+            return inline_nodelist.render(component_context)
+        return self.get_template().render(kwargs)
+
+    def get_cache_key(self, kwargs):
+        """
+        Return the cache key of the output for the resolved arguments.
+        """
+        return fragments.make_key(self, kwargs)
+
+    @classmethod
+    def get_template(cls):
+        """
+        Return the template of the component. Outside of debug mode, the
+        template is looked up once per class.
+        """
+        template = cls.__dict__.get('_template')
+        if template is None:
+            template_string = getattr(cls.Media, 'template_string', None)
+            if template_string is not None:
+                # compiled once, the source can only change with the class
+                template = cls._template = get_template_from_string(template_string)
+                return template
+            template = get_template(cls.Media.template)
+            if not settings.DEBUG:
+                cls._template = template
+        return template
+
+    @classmethod
+    def has_template(cls):
+        """
+        Return whether the component is rendered with a template.
+        """
+        return bool(getattr(cls.Media, 'template', None) or getattr(cls.Media, 'template_string', None))
+
+    @classmethod
+    def get_fingerprint(cls):
+        """
+        Return a digest of what the templates using the component depend on:
+        its options and, when inlined, the source of its template.
+        """
+        fingerprint = cls.options.fingerprint()
+        if cls.inline and cls.has_template():
+            source = cls.get_template().template.source
+            fingerprint += hashlib.sha1(source.encode('utf-8')).hexdigest()
+        return fingerprint
+
+    @classmethod
+    def new_node(cls, kwargs=None, blocks=None):
+        """
+        Build a node of the component without parsing a template.
+        """
+        node = cls.__new__(cls)
+        node.kwargs = kwargs or {}
+        node.blocks = blocks or {}
+        return node
+
+    @classmethod
+    def render_component(cls, context=None, **kwargs):
+        """
+        Render the component from Python values, without parsing a template:
+            ProductTag.render_component(request_context, product=product, content=html)
+        The arguments are validated like in templates, context may be a
+        dictionary. The component is recorded by track_dependencies().
+        """
+        if not isinstance(context, BaseContext):
+            context = Context(context)
+        if not cls.name in registry._registry.keys():
+            registry.register(cls)
+        node = cls.new_node(*cls.options.parse_values(cls.name, kwargs))
+        tracked = _dependencies.get()
+        if tracked is not None:
+            tracked.add(cls)
+        return node.render(context)
+
+    @classmethod
+    def render_many(cls, rows, context=None):
+        """
+        Render the component once for each dictionary of keyword arguments in
+        rows. The rows are validated like the arguments of render_component,
+        the template is looked up once and every row is rendered in the same
+        context frame.
+        """
+        context = context if context is not None else Context()
+        rows = [
+            cls.new_node(*cls.options.parse_values(cls.name, row)).get_render_kwargs(context)
+            for row in rows
+        ]
+        return cls.render_rows(rows, context)
+
+    @classmethod
+    def render_rows(cls, rows, context=None):
+        """
+        Render the component with render_tag for each dictionary of resolved
+        arguments in rows, without validating them.
+        """
+        if cls.render_tag is not Tag.render_tag:
+            node = cls.new_node()
+            context = context if context is not None else Context()
+            return mark_safe(''.join([node.render_tag(context, **row) for row in rows]))
+
+        template = cls.get_template().template
+        row_context = Context(autoescape=template.engine.autoescape)
+        bits = []
+        with row_context.push() as frame:
+            for row in rows:
+                frame.clear()
+                frame.update(row)
+                bits.append(template.render(row_context))
+        return mark_safe(''.join(bits))
+
+    @classmethod
+    def for_tag(cls):
+        """
+        Return the '<name>_for' tag class rendering the component in a loop:
+            {% mytest_for rows as row row.name mykwarg=row.value %}
+        It closes with the end tags declared in the blocks of the component:
+            {% mytest_for rows as row row.name %}{{ row.value }}{% endmytest %}
+        """
+        for_tag = cls.__dict__.get('_for_tag')
+        if for_tag is None:
+            for_tag = mixin(cls, ForTagMixin, attrs={'name': '%s_for' % cls.name})
+            cls._for_tag = for_tag
+        return for_tag
 
     @classmethod
     def render_dependencies(cls):
@@ -129,8 +474,164 @@ class Tag(TagMeta('TagMeta', (Node,), {})):
 
         return dependencies
 
+    @classmethod
+    def get_inline_dependencies(cls):
+        """
+        Return the inline css and js snippets of the component, or None.
+        """
+        inline_css = getattr(cls.Media, 'inline_css', None)
+        inline_js = getattr(cls.Media, 'inline_js', None)
+        return inline_css and inline_css.strip(), inline_js and inline_js.strip()
+
     def __repr__(self): # pragma: no cover
         return '<Tag: %s>' % self.name
 
 
+class ForTagMixin(object):
+    """
+    Loop variant of a component. The loop bits are removed from the tokens
+    before the arguments of the component are parsed.
+    """
+    def __init__(self, parser, tokens):
+        bits = tokens.split_contents()
+        if len(bits) < 4 or bits[2] != 'as':
+            raise LoopSyntaxError(bits[0])
+        self.rows = parser.compile_filter(bits[1])
+        self.loopvar = bits[3]
+        tokens = Token(tokens.token_type, ' '.join([bits[0]] + bits[4:]), tokens.position, tokens.lineno)
+        super(ForTagMixin, self).__init__(parser, tokens)
+
+    def render(self, context):
+        rows = self.rows.resolve(context, True) or []
+        with context.push():
+            if not self._plain_render or profiling.instrumented:
+                # each row goes through the render path of the component
+                render = super(ForTagMixin, self).render
+                return mark_safe(''.join([render(context) for _ in self.iter_rows(context, rows)]))
+            kwargs_rows = self.iter_render_kwargs(context, rows)
+            if type(self).render_tag is Tag.render_tag:
+                return self.render_rows(kwargs_rows)
+            return mark_safe(''.join([self.render_tag(context, **kwargs) for kwargs in kwargs_rows]))
+
+    def iter_rows(self, context, rows):
+        for row in rows:
+            context[self.loopvar] = row
+            yield row
+
+    def iter_render_kwargs(self, context, rows):
+        for _ in self.iter_rows(context, rows):
+            yield self.get_render_kwargs(context)
+
+
+def get_template_dependencies(template):
+    """
+    Return the templates extended or included by a compiled template with a
+    constant name. Templates which fail to load are left out, their errors
+    are raised when rendering.
+    """
+    templates = []
+    for node in template.nodelist.get_nodes_by_type((ExtendsNode, IncludeNode)):
+        name = node.parent_name if isinstance(node, ExtendsNode) else node.template
+        if name.filters or not isinstance(name.var, six.string_types):
+            continue
+        try:
+            templates.append(template.engine.get_template(name.var))
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            continue
+    return templates
+
+
+def get_dependencies_manifest(template):
+    """
+    Return the component classes used by a compiled template, by the
+    templates it extends or includes and by the templates of these
+    components. The manifest is kept on the template.
+    """
+    manifest = getattr(template, '_components_manifest', None)
+    if manifest is None:
+        manifest = []
+        templates = [template]
+        seen = set()
+        while templates:
+            current = templates.pop(0)
+            if id(current) in seen:
+                continue
+            seen.add(id(current))
+            templates.extend(get_template_dependencies(current))
+            nodes = current.nodelist.get_nodes_by_type(Tag)
+            for component_class in [type(node) for node in nodes]:
+                if component_class in manifest:
+                    continue
+                manifest.append(component_class)
+                if component_class.has_template():
+                    templates.append(component_class.get_template().template)
+        template._components_manifest = manifest
+    return manifest
+
+
+_dependencies = contextvars.ContextVar('component_tags_dependencies', default=None)
+
+
+@contextmanager
+def track_dependencies():
+    """
+    Record the component classes rendered with Tag.render_component within
+    the block:
+        with track_dependencies() as component_classes:
+            html = ProductTag.render_component(product=product)
+        html += render_dependencies(component_classes)
+    """
+    tracked = set()
+    token = _dependencies.set(tracked)
+    try:
+        yield tracked
+    finally:
+        _dependencies.reset(token)
+
+
+def get_tracked_dependencies():
+    """
+    Return the component classes recorded by track_dependencies(), and the
+    components used by their templates.
+    """
+    tracked = _dependencies.get()
+    if not tracked:
+        return []
+    component_classes = []
+    for component_class in list(tracked):
+        if component_class not in component_classes:
+            component_classes.append(component_class)
+        if component_class.has_template():
+            for used_class in get_dependencies_manifest(component_class.get_template().template):
+                if used_class not in component_classes:
+                    component_classes.append(used_class)
+    return component_classes
+
+
+def render_dependencies(component_classes):
+    """
+    Return the sorted, unique css and js imports of the component classes,
+    followed by their unique inline css and js snippets.
+    """
+    out = []
+    inline_css = []
+    inline_js = []
+    for component_class in component_classes:
+        import_static_files = component_class.render_dependencies()
+        for import_static_file in import_static_files:
+            if not import_static_file in out:
+                out.append(import_static_file)
+        css, js = component_class.get_inline_dependencies()
+        if css and css not in inline_css:
+            inline_css.append(css)
+        if js and js not in inline_js:
+            inline_js.append(js)
+    out.sort()
+    if inline_css:
+        out.append(Tag.INLINE_CSS_TEMPLATE.format("\n".join(inline_css)))
+    if inline_js:
+        out.append(Tag.INLINE_JS_TEMPLATE.format("\n".join(inline_js)))
+    return mark_safe("\n".join(out) + "\n")
+
+
 registry = ComponentRegistry()
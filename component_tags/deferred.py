@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+from decimal import Decimal
+from uuid import UUID
+
+from django.apps import apps
+from django.core import signing
+from django.db.models import Model
+from django.urls import reverse
+from django.utils.dateparse import parse_date, parse_datetime, parse_duration, parse_time
+from django.utils.duration import duration_iso_string
+from django.utils.html import format_html
+from django.utils.http import urlencode
+from django.utils.safestring import SafeData, mark_safe
+
+from . import budget
+
+SALT = 'component_tags.deferred'
+
+PLACEHOLDER_HTML = '<div class="component-deferred" data-component-src="{}">{}</div>'
+
+# Replace each placeholder by the output of its component once visible. The
+# loader is defined once per page and each run only picks the placeholders
+# not seen yet, including those of the outputs it inserts.
+LOADER_SCRIPT = mark_safe(
+    '<script type="text/javascript">(function(w,d){var f=w.componentTagsDeferred;if(!f){'
+    'var load=function(el){fetch(el.getAttribute("data-component-src"),{credentials:"same-origin"})'
+    '.then(function(r){return r.ok?r.text():Promise.reject(r)})'
+    '.then(function(html){el.outerHTML=html;f()},function(){})},'
+    'o="IntersectionObserver" in w&&new w.IntersectionObserver(function(es){es.forEach(function(e){'
+    'if(e.isIntersecting){o.unobserve(e.target);load(e.target)}})},{rootMargin:"200px"});'
+    'f=w.componentTagsDeferred=function(){'
+    '[].forEach.call(d.querySelectorAll("[data-component-src]:not([data-component-seen])"),function(el){'
+    'el.setAttribute("data-component-seen","");o?o.observe(el):load(el)})}}'
+    'f()})(window,document);</script>'
+)
+
+
+# tag, type, encoder: the values which JSON does not represent, decoded by
+# DECODERS (datetime before date, its subclass; isoformat keeps the
+# microseconds dropped by DjangoJSONEncoder)
+TAGGED_TYPES = (
+    ('__datetime__', datetime.datetime, datetime.datetime.isoformat),
+    ('__date__', datetime.date, datetime.date.isoformat),
+    ('__time__', datetime.time, datetime.time.isoformat),
+    ('__timedelta__', datetime.timedelta, duration_iso_string),
+    ('__decimal__', Decimal, str),
+    ('__uuid__', UUID, str),
+)
+DECODERS = {
+    '__datetime__': parse_datetime,
+    '__date__': parse_date,
+    '__time__': parse_time,
+    '__timedelta__': parse_duration,
+    '__decimal__': Decimal,
+    '__uuid__': UUID,
+}
+
+
+def encode(value):
+    """
+    Return the JSON representation of an argument. The values which JSON
+    does not represent are tagged to be decoded to the same type.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, Model):
+        return {'__model__': value._meta.label, 'pk': value.pk}
+    if isinstance(value, SafeData):
+        return {'__safe__': str(value)}
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return dict((key, encode(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    for tag, value_type, encoder in TAGGED_TYPES:
+        if isinstance(value, value_type):
+            return {tag: encoder(value)}
+    raise TypeError("%s values can not be passed to a deferred component" % type(value).__name__)
+
+
+def decode(obj):
+    if '__model__' in obj:
+        return apps.get_model(obj['__model__'])._default_manager.get(pk=obj['pk'])
+    if '__safe__' in obj:
+        return mark_safe(obj['__safe__'])
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag in DECODERS:
+            return DECODERS[tag](value)
+    return obj
+
+
+class ArgumentSerializer(object):
+    """
+    JSON serializer of the arguments of a component for django.core.signing.
+    Model instances are passed by pk, safe strings stay safe and dates,
+    decimals and UUIDs keep their type.
+    """
+    def dumps(self, obj):
+        return json.dumps(encode(obj), separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'), object_hook=decode)
+
+
+def get_url(node, kwargs):
+    """
+    Return the URL of the component view rendering the node with kwargs.
+    """
+    try:
+        token = signing.dumps(
+            {'name': node.name, 'kwargs': kwargs}, salt=SALT, serializer=ArgumentSerializer, compress=True
+        )
+    except TypeError:
+        for key, value in kwargs.items():
+            try:
+                encode(value)
+            except TypeError as e:
+                raise TypeError("The argument '%s' of the deferred component '%s': %s" % (key, node.name, e))
+        raise
+    return '%s?%s' % (reverse('component_tags:component', args=[node.name]), urlencode({'a': token}))
+
+
+def load_kwargs(name, token):
+    """
+    Return the arguments signed by get_url for the component name. Raises
+    django.core.signing.BadSignature for an invalid token.
+    """
+    data = signing.loads(token, salt=SALT, serializer=ArgumentSerializer)
+    if data['name'] != name:
+        raise signing.BadSignature("The token was signed for the component '%s'" % data['name'])
+    return data['kwargs']
+
+
+def render_placeholder(node, context, kwargs):
+    """
+    Output a placeholder (holding the fallback template of the node)
+    followed by the loader script. The script is output with each
+    placeholder, which may be served from the cache of an enclosing
+    component on another page.
+    """
+    html = format_html(PLACEHOLDER_HTML, get_url(node, kwargs), mark_safe(budget.render_fallback(node, kwargs)))
+    return html + LOADER_SCRIPT
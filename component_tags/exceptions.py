@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 from django.template import TemplateSyntaxError
 
-__all__ = ['ArgumentRequiredError', 'DuplicateArgument' 'TooManyArguments']
+__all__ = [
+    'ArgumentRequiredError', 'DuplicateArgument', 'TooManyArguments', 'LoopSyntaxError', 'FrozenError',
+    'UncacheableArgument',
+]
 
 
 class BaseError(TemplateSyntaxError):
@@ -37,7 +40,28 @@ class TooManyArguments(BaseError):
         self.extra = ', '.join(["'%s'" % e for e in extra])
 
 
+class LoopSyntaxError(BaseError):
+    template = "The tag '%(tagname)s' must be written '%(tagname)s <rows> as <name> [arguments]'."
+
+    def __init__(self, tagname):
+        self.tagname = tagname
+
+
 class TemplateSyntaxWarning(Warning):
     """
     Used for variable cleaning TemplateSyntaxErrors when in non-debug-mode.
     """
+
+
+class FrozenError(TypeError):
+    """
+    Raised when options, arguments or the registry are changed after
+    component_tags.freeze().
+    """
+
+
+class UncacheableArgument(TypeError):
+    """
+    Raised by fragments.make_key for an argument without a stable cache key
+    representation. The component is then rendered without the cache.
+    """
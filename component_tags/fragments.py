@@ -0,0 +1,602 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import datetime
+import hashlib
+import re
+import threading
+import time
+import weakref
+import zlib
+from collections import defaultdict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from copy import copy
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.template import Template, loader
+from django.utils.safestring import mark_safe
+
+from . import budget, tracing
+from .exceptions import UncacheableArgument
+from .parallel import TRANSPARENT_NODES
+from .utils import StripedCounter
+
+_batch = contextvars.ContextVar('component_tags_fragments', default=None)
+
+# digits only: the placeholders are left unchanged by the case filters. The
+# id is a hash of the fragment key: the placeholders in the blocks of an
+# enclosing component are part of its cache key.
+PLACEHOLDER = '\x00%d\x00'
+PLACEHOLDER_RE = re.compile('\x00(\\d+)\x00')
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+VERSION_KEY = 'component_tags:version:%s'
+REFRESH_LOCK_TIMEOUT = 60
+
+# types of the arguments represented in the cache keys (bool is an int,
+# True and 1 differ by their repr)
+KEY_TYPES = (str, int, float, Decimal)
+KEY_DATE_TYPES = (datetime.date, datetime.time)
+
+# component class -> (options, cache key prefix)
+_key_prefixes = weakref.WeakKeyDictionary()
+
+# model label -> number of invalidations since the process started
+invalidations = StripedCounter()
+_watched_models = set()
+_started = time.time()
+
+
+def get_cache():
+    return caches[getattr(settings, 'COMPONENT_TAGS_CACHE', 'default')]
+
+
+def make_key_part(value):
+    """
+    Return a stable representation of an argument for the cache keys. Only
+    strings, numbers, dates, model instances (by pk) and lists and
+    dictionaries of them are represented, other values raise
+    UncacheableArgument.
+    """
+    if value is None or isinstance(value, KEY_TYPES):
+        return repr(value)
+    if isinstance(value, KEY_DATE_TYPES):
+        return '%s:%s' % (type(value).__name__, value.isoformat())
+    if isinstance(value, Model):
+        return '%s:%s' % (value._meta.label_lower, value.pk)
+    if isinstance(value, dict):
+        return '{%s}' % ','.join(sorted(
+            '%s:%s' % (make_key_part(k), make_key_part(v)) for k, v in value.items()
+        ))
+    if isinstance(value, (list, tuple)):
+        return '[%s]' % ','.join(make_key_part(v) for v in value)
+    raise UncacheableArgument("%s values can not be part of a cache key" % type(value).__name__)
+
+
+def get_key_prefix(node):
+    """
+    Return the prefix of the cache keys of a component: its name and the
+    fingerprint of its options, computed once per class.
+    """
+    component_class = type(node)
+    options, prefix = _key_prefixes.get(component_class, (None, None))
+    if options is not node.options:
+        options = node.options
+        prefix = 'component_tags:%s:%s' % (node.name, options.fingerprint()[:8])
+        _key_prefixes[component_class] = (options, prefix)
+    return prefix
+
+
+def make_key(node, kwargs):
+    parts = ['%s=%s' % (key, make_key_part(kwargs[key])) for key in sorted(kwargs)]
+    digest = hashlib.md5('\n'.join(parts).encode('utf-8')).hexdigest()
+    return '%s:%s' % (get_key_prefix(node), digest)
+
+
+def get_placeholder_id(key, version_keys):
+    digest = hashlib.md5(' '.join([key] + version_keys).encode('utf-8')).hexdigest()
+    return int(digest[:15], 16)
+
+
+def get_model_label(model):
+    if isinstance(model, str):
+        return model.lower()
+    return model._meta.label_lower
+
+
+def watch(cache_models):
+    """
+    Normalize the Tag.cache_models declaration into (model label, argument
+    name or None) pairs, and invalidate them when instances are saved or
+    deleted.
+    """
+    normalized = []
+    for model in cache_models:
+        argument = None
+        if isinstance(model, (list, tuple)):
+            model, argument = model
+        label = get_model_label(model)
+        _watched_models.add(label)
+        normalized.append((label, argument))
+    return tuple(normalized)
+
+
+def get_version_keys(node, kwargs):
+    keys = []
+    for label, argument in node._cache_models:
+        if argument is None:
+            keys.append(VERSION_KEY % label)
+        else:
+            value = kwargs.get(argument)
+            pk = value.pk if isinstance(value, Model) else value
+            keys.append(VERSION_KEY % '%s:%s' % (label, pk))
+    return keys
+
+
+def get_versions(cache, version_keys):
+    """
+    Fetch the versions of the models. Missing versions are started from the
+    current time so that the fragments stored before their eviction are not
+    used again.
+    """
+    versions = cache.get_many(version_keys)
+    missing = dict((key, int(time.time() * 1000)) for key in version_keys if key not in versions)
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def get_versioned_key(key, version_keys, versions):
+    if not version_keys:
+        return key
+    return '%s:%s' % (key, '.'.join([str(versions[k]) for k in version_keys]))
+
+
+def bump_version(cache, version_key):
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, int(time.time() * 1000), None)
+
+
+def invalidate(sender, instance, **kwargs):
+    """
+    post_save and post_delete receiver changing the versions of the model and
+    of the instance.
+    """
+    label = sender._meta.label_lower
+    if label not in _watched_models:
+        return
+    cache = get_cache()
+    bump_version(cache, VERSION_KEY % label)
+    bump_version(cache, VERSION_KEY % '%s:%s' % (label, instance.pk))
+    invalidations.add(label)
+
+
+post_save.connect(invalidate, dispatch_uid='component_tags.fragments.invalidate')
+post_delete.connect(invalidate, dispatch_uid='component_tags.fragments.invalidate')
+
+
+def get_invalidation_stats():
+    """
+    Return the number and rate (per second) of invalidations by model label.
+    """
+    elapsed = max(time.time() - _started, 1e-9)
+    return dict(
+        (label, {'count': count, 'rate': count / elapsed}) for label, count in invalidations.snapshot().items()
+    )
+
+
+def snapshot(context):
+    """
+    Copy of the context kept for a deferred render: later changes to the
+    variables of the page are not seen.
+    """
+    context_copy = copy(context)
+    context_copy.dicts = [context.flatten()]
+    return context_copy
+
+
+class SingleFlight(object):
+    """
+    Run a function once for concurrent calls with the same key, the other
+    callers wait for the result of the first one.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = func()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+single_flight = SingleFlight()
+
+
+# (component name, counter) -> value, counters: stored, raw_bytes,
+# compressed_bytes, hits, decompress_seconds
+compression_stats = StripedCounter()
+
+
+def get_compress_threshold(node):
+    if node.cache_compress_threshold is not None:
+        return node.cache_compress_threshold
+    return getattr(settings, 'COMPONENT_TAGS_CACHE_COMPRESS_THRESHOLD', None)
+
+
+def compress(node, output):
+    """
+    Return the output, zlib-compressed if it is larger than the compression
+    threshold of the component.
+    """
+    threshold = get_compress_threshold(node)
+    if threshold is None:
+        return output
+    raw = output.encode('utf-8')
+    if len(raw) < threshold:
+        return output
+    compressed = zlib.compress(raw)
+    compression_stats.add((node.name, 'stored'))
+    compression_stats.add((node.name, 'raw_bytes'), len(raw))
+    compression_stats.add((node.name, 'compressed_bytes'), len(compressed))
+    return compressed
+
+
+def decompress(node, payload):
+    if not isinstance(payload, bytes):
+        return payload
+    start = time.perf_counter()
+    output = mark_safe(zlib.decompress(payload).decode('utf-8'))
+    compression_stats.add((node.name, 'hits'))
+    compression_stats.add((node.name, 'decompress_seconds'), time.perf_counter() - start)
+    return output
+
+
+def get_compression_stats():
+    """
+    Return the compression ratio and the decompression time per hit by
+    component name.
+    """
+    counters = defaultdict(dict)
+    for (name, counter), value in compression_stats.snapshot().items():
+        counters[name][counter] = value
+    stats = {}
+    for name, values in counters.items():
+        compressed_bytes, hits = values.get('compressed_bytes', 0), values.get('hits', 0)
+        stats[name] = {
+            'ratio': values.get('raw_bytes', 0) / float(compressed_bytes) if compressed_bytes else None,
+            'seconds_per_hit': values.get('decompress_seconds', 0) / hits if hits else None,
+            'stored': values.get('stored', 0),
+        }
+    return stats
+
+
+def make_entry(node, output):
+    """
+    Cache entry of a fragment: (fresh until, output or compressed output).
+    The entry is kept cache_stale_timeout seconds longer than cache_timeout.
+    """
+    payload = compress(node, output)
+    if node.cache_timeout is None:
+        return (None, payload), None
+    return (time.time() + node.cache_timeout, payload), node.cache_timeout + node.cache_stale_timeout
+
+
+def is_stale(entry):
+    return entry[0] is not None and entry[0] < time.time()
+
+
+def refresh(cache, key, node, context, kwargs):
+    """
+    Render a stale fragment again in a background thread. The lock in the
+    cache lets a single thread of all the workers refresh it.
+    """
+    lock_key = '%s:refresh' % key
+    if not cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT):
+        return None
+
+    def run():
+        _batch.set(None)
+        close_old_connections()
+        try:
+            entry, timeout = make_entry(node, node.render_content(context, kwargs))
+            cache.set(key, entry, timeout)
+        finally:
+            close_old_connections()
+            cache.delete(lock_key)
+
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(run,), name='component_tags-refresh')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def warm(key, node, output):
+    """
+    Store the output of a component rendered past its time budget (see
+    Tag.render_timeout_warm) once its render completes. Renders dropped by
+    a saturated pool have no future.
+    """
+    if not node.render_timeout_warm or output.future is None:
+        return
+
+    def store(future):
+        if future.exception() is None:
+            entry, timeout = make_entry(node, future.result())
+            get_cache().set(key, entry, timeout)
+
+    output.future.add_done_callback(store)
+
+
+class FragmentBatch(object):
+    """
+    Cacheable components (see Tag.cacheable) rendered in a batch scope
+    output a placeholder. splice() then fetches all of them from the cache
+    with one get_many, renders the misses, stores them with one set_many per
+    timeout and replaces the placeholders.
+    """
+    def __init__(self, nodes=None):
+        self.nodes = nodes
+        self.pending = {}  # placeholder id -> (key, version keys, node, context, kwargs)
+        self.versions = {}
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    def accepts(self, node):
+        """
+        Return whether the node is rendered in the batch: any node, or one of
+        the nodes given to the batch.
+        """
+        return self.nodes is None or node in self.nodes
+
+    def add(self, key, version_keys, node, context, kwargs):
+        # components may be added from parallel threads
+        placeholder_id = get_placeholder_id(key, version_keys)
+        if placeholder_id not in self.pending:
+            self.pending.setdefault(placeholder_id, (key, version_keys, node, snapshot(context), kwargs))
+        return PLACEHOLDER % placeholder_id
+
+    def get_nested_version_keys(self, kwargs):
+        """
+        Return the version keys of the fragments whose placeholders are in
+        the arguments (the blocks) of a component: its cached output holds
+        their outputs.
+        """
+        version_keys = []
+        for name in sorted(kwargs):
+            value = kwargs[name]
+            if not isinstance(value, str):
+                continue
+            for pid in PLACEHOLDER_RE.findall(value):
+                for version_key in self.pending.get(int(pid), (None, ()))[1]:
+                    if version_key not in version_keys:
+                        version_keys.append(version_key)
+        return version_keys
+
+    def splice(self, text):
+        # in order of appearance
+        placeholder_ids = [int(pid) for pid in dict.fromkeys(PLACEHOLDER_RE.findall(text))]
+        placeholder_ids = [pid for pid in placeholder_ids if pid in self.pending]
+        if not placeholder_ids:
+            return text
+        with tracing.span('fragments.splice', fragments=len(placeholder_ids)):
+            return self.splice_fragments(text, placeholder_ids)
+
+    def splice_fragments(self, text, placeholder_ids):
+        cache = get_cache()
+        version_keys = set()
+        for pid in placeholder_ids:
+            version_keys.update(self.pending[pid][1])
+        version_keys -= set(self.versions)
+        if version_keys:
+            self.versions.update(get_versions(cache, list(version_keys)))
+
+        keys = {}
+        for pid in placeholder_ids:
+            key, version_keys = self.pending[pid][:2]
+            keys[get_versioned_key(key, version_keys, self.versions)] = pid
+
+        outputs = {}
+        for key, entry in cache.get_many(list(keys)).items():
+            node, context, kwargs = self.pending[keys[key]][2:]
+            if is_stale(entry):
+                refresh(cache, key, node, context, kwargs)
+                self.stale += 1
+            outputs[key] = decompress(node, entry[1])
+        self.hits += len(outputs)
+
+        rendered = defaultdict(dict)
+        for key, pid in keys.items():
+            if key in outputs:
+                continue
+            node, context, kwargs = self.pending[pid][2:]
+            with tracing.span(node.name, cache='miss'):
+                output = single_flight.do(key, lambda: self.render_miss(node, context, kwargs))
+            self.misses += 1
+            if isinstance(output, budget.Fallback):
+                warm(key, node, output)
+                outputs[key] = output
+                continue
+            entry, timeout = make_entry(node, output)
+            outputs[key] = output
+            rendered[timeout][key] = entry
+        for timeout, entries in rendered.items():
+            cache.set_many(entries, timeout)
+
+        outputs = dict((pid, outputs[key]) for key, pid in keys.items())
+        return PLACEHOLDER_RE.sub(lambda m: outputs.get(int(m.group(1)), m.group(0)), text)
+
+    def render_miss(self, node, context, kwargs):
+        output = node.render_output(context, kwargs)
+        if isinstance(output, budget.Fallback):
+            return output
+        return self.splice(output)
+
+
+def get_batch():
+    return _batch.get()
+
+
+@contextmanager
+def batch(nodes=None):
+    """
+    Defer the cacheable components rendered within the block, or only the
+    given nodes:
+        with batch() as fragment_batch:
+            html = fragment_batch.splice(template.render(context))
+    The placeholders must be spliced before the output is used: see
+    BatchedTemplate and render_to_string for a single template render.
+    """
+    fragment_batch = FragmentBatch(nodes)
+    token = _batch.set(fragment_batch)
+    try:
+        yield fragment_batch
+    finally:
+        _batch.reset(token)
+
+
+def find_batch_nodes(nodelist):
+    """
+    Yield the cacheable nodes of a nodelist whose output is used as is: in
+    the nodelist, in the nodelists of its parallel.TRANSPARENT_NODES and in
+    the blocks of its components.
+    """
+    for node in nodelist:
+        if getattr(node, 'cacheable', False):
+            yield node
+        # components define cacheable
+        if isinstance(node, TRANSPARENT_NODES) or hasattr(node, 'cacheable'):
+            for name in node.child_nodelists:
+                child_nodelist = getattr(node, name, None)
+                if child_nodelist:
+                    for child_node in find_batch_nodes(child_nodelist):
+                        yield child_node
+
+
+def get_batch_nodes(template):
+    """
+    Return the cacheable nodes of a compiled template rendered in a batch,
+    found once per template.
+    """
+    nodes = getattr(template, '_batch_nodes', None)
+    if nodes is None:
+        nodes = template._batch_nodes = frozenset(find_batch_nodes(template.nodelist))
+    return nodes
+
+
+class BatchedTemplate(object):
+    """
+    Template (of the Django template backend) rendering its cacheable
+    components in a single batch, spliced before render returns. Components
+    within tags using the output of their content ({% filter %}...), in the
+    templates it includes, or when it is rendered within a batch, are
+    rendered directly.
+    """
+    def __init__(self, template):
+        self.template = template
+
+    def __repr__(self):  # pragma: no cover
+        return '<BatchedTemplate: %r>' % self.template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        compiled = getattr(self.template, 'template', None)
+        if _batch.get() is not None or not isinstance(compiled, Template):
+            return self.template.render(context, request)
+        with batch(get_batch_nodes(compiled)) as fragment_batch:
+            return mark_safe(fragment_batch.splice(self.template.render(context, request)))
+
+
+def render_to_string(template_name, context=None, request=None, using=None):
+    """
+    django.template.loader.render_to_string rendering the cacheable
+    components of the template in a single batch.
+    """
+    if isinstance(template_name, (list, tuple)):
+        template = loader.select_template(template_name, using=using)
+    else:
+        template = loader.get_template(template_name, using=using)
+    return BatchedTemplate(template).render(context, request)
+
+
+def render(node, context, kwargs):
+    try:
+        key = node.get_cache_key(kwargs)
+    except UncacheableArgument:
+        tracing.annotate(cache='skip')
+        return node.render_output(context, kwargs)
+    version_keys = get_version_keys(node, kwargs)
+    fragment_batch = _batch.get()
+    if fragment_batch is not None:
+        version_keys += [
+            version_key for version_key in fragment_batch.get_nested_version_keys(kwargs)
+            if version_key not in version_keys
+        ]
+    if fragment_batch is not None and fragment_batch.accepts(node):
+        tracing.annotate(cache='batch')
+        return fragment_batch.add(key, version_keys, node, context, kwargs)
+
+    cache = get_cache()
+    if version_keys:
+        key = get_versioned_key(key, version_keys, get_versions(cache, version_keys))
+    entry = cache.get(key)
+    if entry is not None:
+        if is_stale(entry):
+            tracing.annotate(cache='stale')
+            refresh(cache, key, node, snapshot(context), kwargs)
+        else:
+            tracing.annotate(cache='hit')
+        return decompress(node, entry[1])
+
+    tracing.annotate(cache='miss')
+    output = single_flight.do(key, lambda: node.render_output(context, kwargs))
+    if isinstance(output, budget.Fallback):
+        warm(key, node, output)
+        return output
+    entry, timeout = make_entry(node, output)
+    cache.set(key, entry, timeout)
+    return output
+
+
+class FragmentCacheMiddleware(object):
+    """
+    Render the cacheable components of the HTML template responses in a
+    single batch: the template of the response is rendered as a
+    BatchedTemplate. Other responses are left as they are.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_template_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type in HTML_CONTENT_TYPES and not isinstance(response.template_name, BatchedTemplate):
+            response.template_name = BatchedTemplate(response.resolve_template(response.template_name))
+        return response
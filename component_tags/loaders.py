@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import threading
+
+import django
+from django.conf import settings
+from django.template import Engine, Origin, Template, TemplateDoesNotExist
+from django.template.loaders import base, cached
+from django.template.smartif import OPERATORS
+
+import component_tags
+
+from .core import Tag, registry
+from .utils import mixin
+
+
+def smartif_operator(key):
+    return OPERATORS[key]
+
+
+class TemplatePickler(pickle.Pickler):
+    """
+    Pickler of compiled nodelists. The engine and the origin of the template
+    are stored as references and given back when loading.
+    """
+    def persistent_id(self, obj):
+        if isinstance(obj, Origin):
+            return 'origin'
+        if isinstance(obj, (base.Loader, Engine)):
+            return 'engine'
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, type):
+            if '_mixin_args' in obj.__dict__:
+                return mixin, obj._mixin_args
+            key = obj.__dict__.get('id')
+            if isinstance(key, str) and OPERATORS.get(key) is obj:
+                return smartif_operator, (key,)
+        return NotImplemented
+
+
+class TemplateUnpickler(pickle.Unpickler):
+    def __init__(self, file, origin, engine):
+        super(TemplateUnpickler, self).__init__(file)
+        self.origin = origin
+        self.engine = engine
+
+    def persistent_load(self, pid):
+        if pid == 'origin':
+            return self.origin
+        if pid == 'engine':
+            return self.engine
+        raise pickle.UnpicklingError('unknown persistent id %r' % (pid,))
+
+
+def get_components_fingerprints(nodelist):
+    classes = set(type(node) for node in nodelist.get_nodes_by_type(Tag))
+    return [(c, c.get_fingerprint()) for c in classes]
+
+
+class PersistentLoaderMixin(base.Loader):
+    """
+    Compile templates through a directory of pickled nodelists, keyed by the
+    template path, the hash of its source and the library and Django
+    versions. Templates using components whose options (or inlined template)
+    changed since they were written are compiled again.
+    """
+    def get_cache_dir(self):
+        return getattr(settings, 'COMPONENT_TAGS_TEMPLATE_CACHE_DIR', None)
+
+    def get_cache_path(self, origin, contents):
+        key = hashlib.sha256()
+        for part in (origin.name, component_tags.__version__, django.get_version(), contents):
+            key.update(str(part).encode('utf-8'))
+            key.update(b'\0')
+        return os.path.join(self.get_cache_dir(), '%s.pickle' % key.hexdigest())
+
+    def get_template(self, template_name, skip=None):
+        if not self.get_cache_dir():
+            return super(PersistentLoaderMixin, self).get_template(template_name, skip)
+
+        tried = []
+        for origin in self.get_template_sources(template_name):
+            if skip is not None and origin in skip:
+                tried.append((origin, 'Skipped'))
+                continue
+            try:
+                contents = self.get_contents(origin)
+            except TemplateDoesNotExist:
+                tried.append((origin, 'Source does not exist'))
+                continue
+            else:
+                return self.load_template(contents, origin)
+        raise TemplateDoesNotExist(template_name, tried=tried)
+
+    def load_template(self, contents, origin):
+        path = self.get_cache_path(origin, contents)
+        nodelist = self.read_nodelist(path, origin)
+        if nodelist is not None:
+            template = Template.__new__(Template)
+            template.name = origin.template_name
+            template.origin = origin
+            template.engine = self.engine
+            template.source = str(contents)
+            template.nodelist = nodelist
+            return template
+
+        template = Template(contents, origin, origin.template_name, self.engine)
+        self.write_nodelist(path, template.nodelist)
+        return template
+
+    def read_nodelist(self, path, origin):
+        try:
+            # read at once: unpickling copies the data into new objects anyway
+            with open(path, 'rb') as f:
+                data = f.read()
+            fingerprints, nodelist = TemplateUnpickler(io.BytesIO(data), origin, self.engine).load()
+        except (OSError, ValueError, EOFError, AttributeError, ImportError, pickle.UnpicklingError):
+            return None
+        for component_class, fingerprint in fingerprints:
+            if component_class.get_fingerprint() != fingerprint:
+                return None
+        for component_class, fingerprint in fingerprints:
+            registry.register(component_class)
+        return nodelist
+
+    def write_nodelist(self, path, nodelist):
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                TemplatePickler(f, pickle.HIGHEST_PROTOCOL).dump(
+                    (get_components_fingerprints(nodelist), nodelist)
+                )
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, AttributeError, pickle.PicklingError):
+            # Templates holding objects which cannot be pickled are only
+            # kept in memory.
+            os.remove(tmp_path)
+
+
+class PersistentLoader(cached.Loader, PersistentLoaderMixin):
+    """
+    Cached loader keeping the compiled templates in
+    COMPONENT_TAGS_TEMPLATE_CACHE_DIR between restarts:
+        'loaders': [
+            ('component_tags.loaders.PersistentLoader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ]
+    """
+
+
+class IndexedLoader(cached.Loader):
+    """
+    Cached loader looking up the component templates in an index of the
+    COMPONENT_TAGS_INDEXED_DIRS ('components' by default) subdirectories of
+    the directories of its loaders, built once, instead of probing every
+    directory for each lookup:
+        'loaders': [
+            ('component_tags.loaders.IndexedLoader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ]
+    With COMPONENT_TAGS_INDEXED_REFRESH (defaults to DEBUG), indexed
+    templates are compiled again when their file changes, and the index is
+    built again when a template is missing from it.
+    """
+    def __init__(self, engine, loaders):
+        super(IndexedLoader, self).__init__(engine, loaders)
+        self.index = None
+        self.index_cache = {}
+        self.index_lock = threading.Lock()
+
+    def get_indexed_dirs(self):
+        return getattr(settings, 'COMPONENT_TAGS_INDEXED_DIRS', ['components'])
+
+    def get_refresh(self):
+        return getattr(settings, 'COMPONENT_TAGS_INDEXED_REFRESH', settings.DEBUG)
+
+    def build_index(self):
+        """
+        Map the names of the templates of the indexed directories to their
+        origin, the first loader and directory finding a name winning.
+        """
+        index = {}
+        for loader in self.loaders:
+            for directory in (loader.get_dirs() if hasattr(loader, 'get_dirs') else []):
+                directory = str(directory)
+                for indexed_dir in self.get_indexed_dirs():
+                    for root, dirs, files in os.walk(os.path.join(directory, indexed_dir)):
+                        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                        for filename in sorted(files):
+                            if filename.startswith('.'):
+                                continue
+                            path = os.path.join(root, filename)
+                            name = os.path.relpath(path, directory).replace(os.sep, '/')
+                            if name not in index:
+                                index[name] = Origin(name=path, template_name=name, loader=loader)
+        return index
+
+    def get_index(self, rebuild=False):
+        if self.index is None or rebuild:
+            with self.index_lock:
+                if self.index is None or rebuild:
+                    self.index = self.build_index()
+                    self.index_cache = {}
+        return self.index
+
+    def get_indexed_template(self, template_name, refresh):
+        origin = self.get_index().get(template_name)
+        if refresh:
+            try:
+                mtime = os.stat(origin.name).st_mtime if origin is not None else None
+            except OSError:
+                # a removed file
+                origin = None
+            if origin is None and template_name.split('/', 1)[0] in self.get_indexed_dirs():
+                # a new or removed file
+                origin = self.get_index(rebuild=True).get(template_name)
+                if origin is not None:
+                    mtime = os.stat(origin.name).st_mtime
+        else:
+            mtime = None
+        if origin is None:
+            return None
+
+        entry = self.index_cache.get(template_name)
+        if entry is None or entry[1] != mtime:
+            contents = origin.loader.get_contents(origin)
+            entry = self.index_cache[template_name] = (Template(contents, origin, template_name, self.engine), mtime)
+        return entry[0]
+
+    def get_template(self, template_name, skip=None):
+        if skip is None:
+            template = self.get_indexed_template(template_name, self.get_refresh())
+            if template is not None:
+                return template
+        return super(IndexedLoader, self).get_template(template_name, skip)
+
+    def reset(self):
+        super(IndexedLoader, self).reset()
+        with self.index_lock:
+            self.index = None
+            self.index_cache = {}
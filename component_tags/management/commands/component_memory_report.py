@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.template import Engine
+
+from component_tags.precompile import discover_templates, memory_report
+
+SORT_KEYS = {
+    'bytes': lambda report: report.bytes,
+    'nodes': lambda report: report.nodes,
+}
+
+
+class Command(BaseCommand):
+    help = "Report the memory retained by the compiled nodes of each component class."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--load', action='store_true',
+            help="Compile every template of the engine first, instead of only walking the cached ones.",
+        )
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='bytes',
+            help="Order of the components, largest first (default: bytes).",
+        )
+        parser.add_argument('--limit', type=int, default=None, help="Number of components to report.")
+
+    def handle(self, *args, **options):
+        engine = Engine.get_default()
+        templates = []
+        if options['load']:
+            for name in discover_templates(engine):
+                try:
+                    templates.append(engine.get_template(name))
+                except Exception as e:
+                    self.stderr.write('%s  %s' % (name, e))
+        reports = memory_report(engine, templates)
+        reports.sort(key=SORT_KEYS[options['sort']], reverse=True)
+        for report in reports[:options['limit']]:
+            self.stdout.write(
+                '%10d bytes  %5d nodes  (values %d, filters %d, nodelists %d)  '
+                'registered %d, mixins %d, manifests %d  %s' % (
+                    report.bytes, report.nodes, report.value_bytes, report.filter_bytes, report.nodelist_bytes,
+                    report.registered, report.mixins, report.manifests, report.name,
+                )
+            )
+        total = sum(report.bytes for report in reports)
+        self.stdout.write('%10d bytes  total, %d components' % (total, len(reports)))
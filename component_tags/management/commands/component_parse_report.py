@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from component_tags.precompile import parse_report
+
+SORT_KEYS = {
+    'parse': lambda report: report.seconds,
+    'nodes': lambda report: report.nodes,
+    'depth': lambda report: report.depth,
+    'cost': lambda report: report.cost,
+}
+
+
+class Command(BaseCommand):
+    help = "Compile every template and report the parse cost of its component tags."
+
+    def add_arguments(self, parser):
+        parser.add_argument('template_names', nargs='*', help="Templates to compile (default: all).")
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='parse',
+            help="Order of the templates, worst first (default: parse).",
+        )
+        parser.add_argument('--limit', type=int, default=None, help="Number of templates to report.")
+
+    def handle(self, *args, **options):
+        reports = parse_report(template_names=options['template_names'] or None)
+        errors = [report for report in reports if report.error]
+        reports = [report for report in reports if not report.error]
+        reports.sort(key=SORT_KEYS[options['sort']], reverse=True)
+        for report in reports[:options['limit']]:
+            self.stdout.write('%10.2f ms  %5d nodes  depth %2d  cost %6d  %s' % (
+                report.seconds * 1000, report.nodes, report.depth, report.cost, report.name
+            ))
+            tags = sorted(report.tags.items(), key=lambda item: item[1].seconds, reverse=True)
+            for name, stats in tags:
+                self.stdout.write('%10.2f ms  %5d x %s  (arguments %.2f ms, compile_filter %.2f ms, blocks %.2f ms)' % (
+                    stats.seconds * 1000, stats.count, name, stats.kwargs_seconds * 1000,
+                    stats.compile_filter_seconds * 1000, stats.blocks_seconds * 1000,
+                ))
+        for report in errors:
+            self.stderr.write('%s  %s' % (report.name, report.error))
+        total = sum(report.seconds for report in reports)
+        self.stdout.write('%10.2f ms  total, %d templates' % (total * 1000, len(reports)))
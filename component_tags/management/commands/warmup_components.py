@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from component_tags import warmup
+
+
+class Command(BaseCommand):
+    help = "Compile every template and component template, and report the compile times."
+
+    def add_arguments(self, parser):
+        parser.add_argument('template_names', nargs='*', help="Templates to compile (default: all).")
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help="Size of the compilation pool used with the persistent loader (default: number of CPUs).",
+        )
+
+    def handle(self, *args, **options):
+        reports = warmup(template_names=options['template_names'] or None, processes=options['processes'])
+        reports.sort(key=lambda report: report.seconds, reverse=True)
+        for report in reports:
+            if report.error:
+                self.stderr.write('%10.2f ms  %s  %s' % (report.seconds * 1000, report.name, report.error))
+            else:
+                self.stdout.write('%10.2f ms  %s  (%d components)' % (
+                    report.seconds * 1000, report.name, len(report.components)
+                ))
+        total = sum(report.seconds for report in reports)
+        self.stdout.write('%10.2f ms  total, %d templates' % (total * 1000, len(reports)))
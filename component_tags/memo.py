@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+_memo = contextvars.ContextVar('component_tags_memo', default=None)
+
+
+class Memo(object):
+    """
+    Outputs of the memoized components (see Tag.memoize) rendered during a
+    request, with hit and miss counters by component name.
+    """
+    def __init__(self):
+        self.fragments = {}
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+    def __repr__(self):  # pragma: no cover
+        return '<Memo: %s hits, %s misses>' % (sum(self.hits.values()), sum(self.misses.values()))
+
+    def render(self, node, context, kwargs):
+        # with the types of the values: 1, True and 1.0 are equal keys
+        key = (type(node), tuple([(name, type(kwargs[name]), kwargs[name]) for name in sorted(kwargs)]))
+        try:
+            output = self.fragments.get(key)
+        except TypeError:
+            # unhashable arguments
+            return node.render_tag(context, **kwargs)
+        if output is not None:
+            with self._lock:
+                self.hits[node.name] += 1
+            return output
+        output = self.fragments[key] = node.render_tag(context, **kwargs)
+        with self._lock:
+            self.misses[node.name] += 1
+        return output
+
+
+def get_memo():
+    """
+    Return the Memo of the current scope, or None.
+    """
+    return _memo.get()
+
+
+@contextmanager
+def memo_scope():
+    """
+    Memoize components rendered within the block:
+        with memo_scope() as memo:
+            html = template.render(context)
+        memo.hits
+    """
+    memo = Memo()
+    token = _memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _memo.reset(token)
+
+
+def render(node, context, kwargs):
+    memo = _memo.get()
+    if memo is None:
+        return node.render_tag(context, **kwargs)
+    return memo.render(node, context, kwargs)
+
+
+class MemoMiddleware(object):
+    """
+    Open a memo scope for each request. The Memo is available as
+    request.component_memo.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with memo_scope() as memo:
+            request.component_memo = memo
+            return self.get_response(request)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import itertools
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.template import Node, NodeList
+from django.template.defaulttags import ForNode, IfEqualNode, IfNode, WithNode
+from django.template.loader_tags import BlockNode
+from django.utils.safestring import mark_safe
+
+DEFAULT_WORKERS = 4
+DEFAULT_LIMIT = 4
+
+# digits only: the markers are left unchanged by the filters of the
+# template tags wrapping the parallel nodes ({% filter upper %}...)
+MARKER = '\x01%d\x01'
+MARKER_RE = re.compile('\x01(\\d+)\x01')
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+_scope = contextvars.ContextVar('component_tags_parallel', default=None)
+_marker_ids = itertools.count()
+
+
+def get_executor():
+    """
+    Return the thread pool shared by the process, or None when parallel
+    rendering is disabled (COMPONENT_TAGS_PARALLEL_WORKERS = 0).
+    """
+    global _executor
+    workers = getattr(settings, 'COMPONENT_TAGS_PARALLEL_WORKERS', DEFAULT_WORKERS)
+    if not workers:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='component_tags')
+    return _executor
+
+
+def in_worker():
+    return getattr(_worker, 'active', False)
+
+
+def get_scope():
+    """
+    Return the ParallelScope of the ParallelNodeList being rendered, or None.
+    """
+    return _scope.get()
+
+
+def render_node(node, context, semaphore):
+    """
+    Render a node in a worker thread. Database connections opened by the node
+    are handled like at the end of a request.
+    """
+    _worker.active = True
+    # the parallel nodes of the component blocks render sequentially
+    _scope.set(None)
+    close_old_connections()
+    try:
+        return node.render_annotated(context)
+    finally:
+        close_old_connections()
+        _worker.active = False
+        semaphore.release()
+
+
+def snapshot(context):
+    """
+    Private copy of the template context: the variables of a loop are updated
+    in place ({% for %} and its forloop dictionary) while the node renders.
+    """
+    context_copy = copy(context)
+    context_copy.dicts = [dict(
+        (key, copy(value) if type(value) is dict else value) for key, value in context.flatten().items()
+    )]
+    context_copy.push()
+    return context_copy
+
+
+def submit(executor, node, context, semaphore):
+    """
+    Submit the rendering of a node with a private copy of the template context
+    and of the context variables of the current thread. The semaphore is
+    acquired by the caller and released once the node is rendered.
+    """
+    return executor.submit(contextvars.copy_context().run, render_node, node, snapshot(context), semaphore)
+
+
+class ParallelScope(object):
+    """
+    Parallel nodes of the ParallelNodeList being rendered, and the futures of
+    their outputs. The semaphore limits the nodes rendering at the same time
+    for all the scopes of the request.
+    """
+    def __init__(self, executor, nodes, semaphore):
+        self.executor = executor
+        self.nodes = nodes
+        self.semaphore = semaphore
+        self.futures = {}
+
+    def __repr__(self):  # pragma: no cover
+        return '<ParallelScope: %s nodes, %s pending>' % (len(self.nodes), len(self.futures))
+
+    def submit(self, node, context):
+        """
+        Submit the rendering of a node, and return the marker replaced by
+        its output at the end of the scope.
+        """
+        self.semaphore.acquire()
+        try:
+            future = submit(self.executor, node, context, self.semaphore)
+        except BaseException:
+            self.semaphore.release()
+            raise
+        marker_id = next(_marker_ids)
+        self.futures[marker_id] = future
+        return MARKER % marker_id
+
+    def resolve(self, output):
+        """
+        Replace the markers of the submitted nodes by their outputs.
+        """
+        if not self.futures:
+            return output
+
+        def replace(match):
+            future = self.futures.get(int(match.group(1)))
+            return match.group(0) if future is None else str(future.result())
+        return MARKER_RE.sub(replace, output)
+
+    def cancel(self):
+        for future in self.futures.values():
+            if future.cancel():
+                self.semaphore.release()
+
+
+class ParallelNodeList(NodeList):
+    """
+    NodeList rendering its parallel nodes (see Tag.parallel) in the thread
+    pool, including those within its {% for %}, {% if %}, {% with %}... tags.
+    A marker is rendered in place of each parallel node and replaced by its
+    output once the nodelist is rendered. At most
+    COMPONENT_TAGS_PARALLEL_LIMIT nodes are rendering at the same time for
+    a request, the nested nodelists sharing the limit of the outer one.
+    """
+    @property
+    def parallel_nodes(self):
+        nodes = self.__dict__.get('_parallel_nodes')
+        if nodes is None:
+            nodes = self._parallel_nodes = frozenset(find_parallel_nodes(self))
+        return nodes
+
+    def render(self, context):
+        executor = get_executor()
+        if executor is None or in_worker():
+            return super(ParallelNodeList, self).render(context)
+
+        outer = _scope.get()
+        if outer is not None:
+            semaphore = outer.semaphore
+        else:
+            semaphore = threading.BoundedSemaphore(getattr(settings, 'COMPONENT_TAGS_PARALLEL_LIMIT', DEFAULT_LIMIT))
+        scope = ParallelScope(executor, self.parallel_nodes, semaphore)
+        token = _scope.set(scope)
+        try:
+            try:
+                output = super(ParallelNodeList, self).render(context)
+            finally:
+                _scope.reset(token)
+            return mark_safe(scope.resolve(output))
+        finally:
+            scope.cancel()
+
+
+class ParallelNode(Node):
+    """
+    Node of the {% parallel %} tag.
+    """
+    child_nodelists = ('nodelist',)
+
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        return self.nodelist.render(context)
+
+
+# template tags outputting the nodes of their nodelists unchanged, their
+# parallel nodes can be replaced by a marker ({% filter %}, {% spaceless %}
+# or {% ifchanged %} use the output of their nodes)
+TRANSPARENT_NODES = (ForNode, IfNode, IfEqualNode, WithNode, BlockNode, ParallelNode)
+
+
+def find_parallel_nodes(nodelist):
+    """
+    Yield the parallel nodes of a nodelist and of the nodelists of its
+    TRANSPARENT_NODES. The blocks of the components and the nested
+    ParallelNodeList render their own parallel nodes.
+    """
+    for node in nodelist:
+        if getattr(node, 'parallel', False):
+            yield node
+        elif isinstance(node, TRANSPARENT_NODES):
+            for name in node.child_nodelists:
+                child_nodelist = getattr(node, name, None)
+                if child_nodelist and not isinstance(child_nodelist, ParallelNodeList):
+                    for child_node in find_parallel_nodes(child_nodelist):
+                        yield child_node
+
+
+def parallelize(nodelist):
+    """
+    Return a ParallelNodeList if the nodelist holds parallel nodes.
+    """
+    if isinstance(nodelist, ParallelNodeList):
+        return nodelist
+    for node in find_parallel_nodes(nodelist):
+        return ParallelNodeList(nodelist)
+    return nodelist
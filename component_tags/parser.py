@@ -1,10 +1,82 @@
 # -*- coding: utf-8 -*-
-from copy import copy, deepcopy
+import contextvars
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from copy import copy
 
 from django import template
+from django.utils.html import conditional_escape
 
 from .arguments import Argument, Flag, KeywordArgument
 from .exceptions import ArgumentRequiredError, TooManyArguments
+from .utils import StaticVariable
+
+_timings = contextvars.ContextVar('component_tags_parse_timings', default=None)
+
+
+class ParseStats(object):
+    """
+    Parse times of a component tag. blocks_seconds excludes the components
+    nested in the blocks.
+    """
+    __slots__ = ('count', 'kwargs_seconds', 'blocks_seconds', 'compile_filter_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.kwargs_seconds = 0.0
+        self.blocks_seconds = 0.0
+        self.compile_filter_seconds = 0.0
+
+    @property
+    def seconds(self):
+        return self.kwargs_seconds + self.blocks_seconds
+
+
+class ParseTimings(object):
+    """
+    ParseStats of the component tags parsed within timed_parsing(), by tag
+    name.
+    """
+    def __init__(self):
+        self.tags = defaultdict(ParseStats)
+        # parse time of the components nested in the blocks being parsed
+        self.nested = []
+
+
+class TimedParser(object):
+    """
+    Django template parser proxy timing compile_filter().
+    """
+    def __init__(self, parser, stats):
+        self._parser = parser
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._parser, name)
+
+    def compile_filter(self, token):
+        start = time.perf_counter()
+        try:
+            return self._parser.compile_filter(token)
+        finally:
+            self._stats.compile_filter_seconds += time.perf_counter() - start
+
+
+@contextmanager
+def timed_parsing():
+    """
+    Time the parsing of the component tags compiled within the block:
+        with timed_parsing() as timings:
+            Template(source)
+        timings.tags
+    """
+    timings = ParseTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
 
 
 class Parser(object):
@@ -28,6 +100,12 @@ class Parser(object):
 
         # get a copy of the bits (tokens)
         self.todo = list(self.bits)
+
+        timings = _timings.get()
+        if timings is not None:
+            self.parse_timed(timings)
+            return self.kwargs, self.blocks
+
         # parse the bits (tokens)
         self.parse_kwargs()
 
@@ -35,6 +113,30 @@ class Parser(object):
         self.parse_blocks()
         return self.kwargs, self.blocks
 
+    def parse_timed(self, timings):
+        stats = timings.tags[self.tagname]
+        stats.count += 1
+        parser = self.parser
+        start = time.perf_counter()
+        self.parser = TimedParser(parser, stats)
+        try:
+            self.parse_kwargs()
+        finally:
+            self.parser = parser
+        kwargs_seconds = time.perf_counter() - start
+        stats.kwargs_seconds += kwargs_seconds
+
+        timings.nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            self.parse_blocks()
+        finally:
+            blocks_seconds = time.perf_counter() - start
+            nested_seconds = timings.nested.pop()
+        stats.blocks_seconds += blocks_seconds - nested_seconds
+        if timings.nested:
+            timings.nested[-1] += kwargs_seconds + blocks_seconds
+
     def parse_kwargs(self):
         kwargs_arguments = []
         flag_arguments = []
@@ -85,7 +187,7 @@ class Parser(object):
                             self.todo.remove(b)
                             break
             if not a.name in self.kwargs.keys():
-                a.parse(self.parser, False, self.kwargs)
+                a.parse(self.parser, 'False', self.kwargs)
 
         bits = self.todo
         nb_bits = len(bits)
@@ -120,7 +222,7 @@ class Parser(object):
         if not self.options.blocks:
             return
         # copy the blocks
-        blocks = deepcopy(self.options.blocks)
+        blocks = list(self.options.blocks)
         identifiers = {}
         for block in blocks:
             identifiers[block] = block.names
@@ -138,3 +240,32 @@ class Parser(object):
                 self.blocks[empty_block.alias] = template.NodeList()
             self.blocks[current_block.alias] = nodelist
 
+    def parse_values(self, tagname, values):
+        """
+        Build the arguments and blocks from Python values instead of template
+        tokens. Blocks are escaped unless they are safe strings.
+        """
+        # default values are template tokens
+        self.parser = template.base.Parser([])
+        self.tagname = tagname
+        self.kwargs = {}
+        self.blocks = {}
+        values = dict(values)
+
+        for a in self.options.arguments:
+            if a.name in values:
+                self.kwargs[a.name] = a.value_class(StaticVariable(values.pop(a.name)))
+            elif isinstance(a, Flag):
+                self.kwargs[a.name] = a.value_class(StaticVariable(False))
+            elif a.required:
+                raise ArgumentRequiredError(a, self.tagname)
+            elif a.default is not None:
+                a.parse(self.parser, a.default, self.kwargs)
+
+        for block in self.options.blocks:
+            content = conditional_escape(values.pop(block.alias, ''))
+            self.blocks[block.alias] = template.NodeList([template.base.TextNode(content)])
+
+        if values:
+            raise TooManyArguments(self.tagname, sorted(values))
+        return self.kwargs, self.blocks
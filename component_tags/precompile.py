@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+import enum
+import gc
+import multiprocessing
+import os
+import sys
+import time
+import types
+
+from django.template import Engine, Library, Node, Origin, Template, TemplateDoesNotExist, TemplateSyntaxError
+from django.template.base import FilterExpression
+
+from . import utils
+from .core import Tag, get_dependencies_manifest, registry
+from .parser import timed_parsing
+
+
+class CompileReport(object):
+    """
+    Compilation of one template during the warmup.
+    """
+    def __init__(self, name, seconds, components=None, error=None):
+        self.name = name
+        self.seconds = seconds
+        self.components = components or []
+        self.error = error
+
+    def __repr__(self):  # pragma: no cover
+        return '<CompileReport: %s %.2fms>' % (self.name, self.seconds * 1000)
+
+
+class ParseReport(object):
+    """
+    Parse costs of one template: compile time, number of nodes, maximum
+    component nesting depth, estimated render cost (nodes rendered with the
+    component templates expanded, loops counted once) and ParseStats by
+    component tag name.
+    """
+    def __init__(self, name, seconds, nodes=0, depth=0, cost=0, tags=None, error=None):
+        self.name = name
+        self.seconds = seconds
+        self.nodes = nodes
+        self.depth = depth
+        self.cost = cost
+        self.tags = tags or {}
+        self.error = error
+
+    def __repr__(self):  # pragma: no cover
+        return '<ParseReport: %s %.2fms>' % (self.name, self.seconds * 1000)
+
+
+class MemoryReport(object):
+    """
+    Memory retained by the compiled nodes of one component class, in bytes:
+    the nodes, their Value objects, the FilterExpressions (or constants) the
+    values wrap and the nodelists of the blocks (without the components they
+    hold). registered, mixins and manifests count the registry entries, the
+    mixin classes (e.g. for_tag) and the dependency manifests referencing the
+    class.
+    """
+    def __init__(self, component_class):
+        self.component_class = component_class
+        self.nodes = 0
+        self.node_bytes = 0
+        self.value_bytes = 0
+        self.filter_bytes = 0
+        self.nodelist_bytes = 0
+        self.registered = 0
+        self.mixins = 0
+        self.manifests = 0
+
+    def __repr__(self):  # pragma: no cover
+        return '<MemoryReport: %s %d bytes>' % (self.name, self.bytes)
+
+    @property
+    def name(self):
+        return self.component_class.name
+
+    @property
+    def bytes(self):
+        return self.node_bytes + self.value_bytes + self.filter_bytes + self.nodelist_bytes
+
+
+# shared by every node, not retained by any of them
+SHARED_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    enum.Enum, Engine, Library, Origin, Template, Tag,
+)
+
+
+def get_size(obj, seen):
+    """
+    Return the size of obj and of the objects it holds, skipping the objects
+    already seen, the shared ones and the nested components.
+    """
+    if id(obj) in seen or isinstance(obj, SHARED_TYPES):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += get_size(key, seen) + get_size(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += get_size(item, seen)
+    elif not isinstance(obj, (str, bytes, int, float)):
+        if hasattr(obj, '__dict__'):
+            size += get_size(obj.__dict__, seen)
+        for klass in type(obj).__mro__:
+            for slot in klass.__dict__.get('__slots__', ()):
+                if slot != '__dict__' and hasattr(obj, slot):
+                    size += get_size(getattr(obj, slot), seen)
+    return size
+
+
+def get_cached_templates(engine):
+    """
+    List the compiled templates held by the engine: the templates of its
+    cached loaders and the templates of the imported components.
+    """
+    templates = []
+
+    def add(template):
+        if isinstance(template, Template) and template not in templates:
+            templates.append(template)
+
+    def walk(loaders):
+        for loader in loaders:
+            for template in list(getattr(loader, 'get_template_cache', {}).values()):
+                add(template)
+            for template in list(getattr(loader, 'template_cache', {}).values()):
+                add(template)
+            walk(getattr(loader, 'loaders', []))
+
+    walk(engine.template_loaders)
+    for component_class in get_component_classes():
+        template = component_class.__dict__.get('_template')
+        if template is not None:
+            add(getattr(template, 'template', template))
+    return templates
+
+
+def measure_node(report, node, seen):
+    report.nodes += 1
+    seen.add(id(node))
+    report.node_bytes += sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+    seen.add(id(node.__dict__))
+    for key, value in node.__dict__.items():
+        if key == 'kwargs':
+            report.value_bytes += sys.getsizeof(value)
+            seen.add(id(value))
+            for argument_value in value.values():
+                report.filter_bytes += get_size(argument_value.var, seen)
+                report.value_bytes += get_size(argument_value, seen)
+        elif key == 'blocks':
+            report.nodelist_bytes += get_size(value, seen)
+        elif isinstance(value, FilterExpression):
+            report.filter_bytes += get_size(value, seen)
+        elif key != 'inline_nodelist':
+            # the inlined nodelist belongs to the template of the component
+            report.node_bytes += get_size(value, seen)
+
+
+def memory_report(engine=None, templates=()):
+    """
+    Walk the compiled templates held by the engine (and the given ones) and
+    return a MemoryReport by component class, largest first.
+    """
+    engine = engine or Engine.get_default()
+    templates = get_cached_templates(engine) + list(templates)
+    reports = {}
+    seen = set()
+
+    def get_report(component_class):
+        if component_class not in reports:
+            reports[component_class] = MemoryReport(component_class)
+        return reports[component_class]
+
+    for template in templates:
+        for node in template.nodelist.get_nodes_by_type(Tag):
+            if id(node) not in seen:
+                measure_node(get_report(type(node)), node, seen)
+        for component_class in getattr(template, '_components_manifest', None) or ():
+            get_report(component_class).manifests += 1
+
+    for component_class, report in reports.items():
+        report.registered = sum(
+            1 for component in list(registry._registry.values())
+            if component is component_class or type(component) is component_class
+        )
+        report.mixins = sum(1 for key in list(utils._mixins) if key[0] is component_class)
+    return sorted(reports.values(), key=lambda report: report.bytes, reverse=True)
+
+
+def get_loader_dirs(loaders):
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            # django.template.loaders.cached.Loader
+            for directory in get_loader_dirs(loader.loaders):
+                yield directory
+        elif hasattr(loader, 'get_dirs'):
+            for directory in loader.get_dirs():
+                yield str(directory)
+
+
+def discover_templates(engine):
+    """
+    List the names of the templates found in the directories of the engine
+    loaders.
+    """
+    names = []
+    for directory in get_loader_dirs(engine.template_loaders):
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for filename in sorted(files):
+                if filename.startswith('.'):
+                    continue
+                name = os.path.relpath(os.path.join(root, filename), directory)
+                name = name.replace(os.sep, '/')
+                if name not in names:
+                    names.append(name)
+    return names
+
+
+def get_component_classes(parent=Tag):
+    """
+    List the imported component classes.
+    """
+    classes = []
+    for component_class in parent.__subclasses__():
+        classes.append(component_class)
+        classes.extend(get_component_classes(component_class))
+    return classes
+
+
+def has_persistent_loader(loaders):
+    from .loaders import PersistentLoaderMixin
+
+    for loader in loaders:
+        if isinstance(loader, PersistentLoaderMixin) and loader.get_cache_dir():
+            return True
+        if has_persistent_loader(getattr(loader, 'loaders', [])):
+            return True
+    return False
+
+
+_pool_engine = None
+
+
+def compile_template(name):
+    """
+    Compile a template in a process of the warmup pool, writing it to the
+    persistent cache.
+    """
+    start = time.perf_counter()
+    try:
+        _pool_engine.get_template(name)
+    except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError):
+        pass
+    return name, time.perf_counter() - start
+
+
+def warmup(engine=None, template_names=None, processes=None):
+    """
+    Compile the templates of the engine and of the imported components so
+    that the template caches, the per-class component templates and the
+    dependency manifests are ready. Call it before forking workers to share
+    the compiled templates between them.
+
+    With the persistent loader (see loaders.PersistentLoader), templates are
+    first compiled to the cache directory by a pool of processes, and then
+    loaded from it.
+
+    Return a CompileReport list.
+    """
+    engine = engine or Engine.get_default()
+    if template_names is None:
+        template_names = discover_templates(engine)
+
+    global _pool_engine
+    compile_times = {}
+    if processes != 1 and has_persistent_loader(engine.template_loaders):
+        # The engine is inherited by the forked processes.
+        _pool_engine = engine
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            compile_times.update(pool.map(compile_template, template_names))
+
+    reports = []
+    for name in template_names:
+        start = time.perf_counter()
+        try:
+            template = engine.get_template(name)
+            components = get_dependencies_manifest(template)
+        except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError) as e:
+            reports.append(CompileReport(name, time.perf_counter() - start, error=e))
+        else:
+            seconds = compile_times.get(name, time.perf_counter() - start)
+            reports.append(CompileReport(name, seconds, components))
+
+    names = set(template_names)
+    for component_class in get_component_classes():
+        if not component_class.has_template():
+            continue
+        name = getattr(component_class.Media, 'template', None) or '<%s template_string>' % component_class.__name__
+        start = time.perf_counter()
+        try:
+            template = component_class.get_template()
+            report = CompileReport(name, 0, get_dependencies_manifest(template.template))
+        except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+            report = CompileReport(name, 0, error=e)
+        report.seconds = time.perf_counter() - start
+        if name not in names:
+            names.add(name)
+            reports.append(report)
+    return reports
+
+
+def measure_nodelist(nodelist, path=()):
+    """
+    Return the number of nodes rendered for the nodelist, with the templates
+    of its components, and the maximum component nesting depth.
+    """
+    nodes = depth = 0
+    for node in nodelist:
+        nodes += 1
+        if not isinstance(node, Node):
+            continue
+        node_depth = 0
+        for attr in node.child_nodelists:
+            child_nodelist = getattr(node, attr, None)
+            if child_nodelist:
+                child_nodes, child_depth = measure_nodelist(child_nodelist, path)
+                nodes += child_nodes
+                node_depth = max(node_depth, child_depth)
+        if isinstance(node, Tag):
+            component_class = type(node)
+            if (component_class.has_template() and component_class not in path and
+                    'inline_nodelist' not in node.__dict__):
+                try:
+                    template = component_class.get_template().template
+                except (TemplateDoesNotExist, TemplateSyntaxError):
+                    pass
+                else:
+                    child_nodes, child_depth = measure_nodelist(template.nodelist, path + (component_class,))
+                    nodes += child_nodes
+                    node_depth = max(node_depth, child_depth)
+            node_depth += 1
+        depth = max(depth, node_depth)
+    return nodes, depth
+
+
+def get_template_source(engine, name):
+    """
+    Return the source and the origin of a template of the engine, without
+    compiling it (engine.find_template compiles and caches the template).
+    """
+    for loader in engine.template_loaders:
+        for origin in loader.get_template_sources(name):
+            try:
+                return origin.loader.get_contents(origin), origin
+            except TemplateDoesNotExist:
+                continue
+    raise TemplateDoesNotExist(name)
+
+
+def parse_report(engine=None, template_names=None):
+    """
+    Compile the templates of the engine again, bypassing the template
+    caches, and return a ParseReport list.
+    """
+    engine = engine or Engine.get_default()
+    if template_names is None:
+        template_names = discover_templates(engine)
+
+    reports = []
+    for name in template_names:
+        try:
+            source, origin = get_template_source(engine, name)
+            with timed_parsing() as timings:
+                start = time.perf_counter()
+                template = Template(source, origin, name, engine)
+                seconds = time.perf_counter() - start
+        except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError) as e:
+            reports.append(ParseReport(name, 0, error=e))
+            continue
+        cost, depth = measure_nodelist(template.nodelist)
+        nodes = len(template.nodelist.get_nodes_by_type(Node))
+        reports.append(ParseReport(name, seconds, nodes, depth, cost, dict(timings.tags)))
+    return reports
+
+
+def freeze(gc_freeze=True):
+    """
+    Freeze the options and arguments of the imported components and the
+    registry, rejecting later changes. Call it after warmup() in the master
+    process: with gc_freeze, the objects allocated so far are moved to the
+    permanent generation of the garbage collector so that forked workers do
+    not write to their memory pages when collecting.
+    """
+    for component_class in get_component_classes():
+        registry.register(component_class)
+        component_class.options.freeze()
+    registry.freeze()
+    if gc_freeze:
+        gc.collect()
+        gc.freeze()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from contextlib import contextmanager
+
+from .signals import component_rendered
+from .utils import StripedCounter
+
+enabled = False
+# profiling or tracing enabled: the only flag checked by Tag.render, they
+# cost a single attribute lookup when both are disabled
+instrumented = False
+_tracing = False
+
+_local = threading.local()
+
+
+COUNTERS = ('calls', 'seconds', 'self_seconds', 'resolve_seconds', 'bytes')
+
+# (component name, counter) -> value
+stats = StripedCounter()
+
+
+def update_instrumented(tracing=None):
+    global instrumented, _tracing
+    if tracing is not None:
+        _tracing = tracing
+    instrumented = enabled or _tracing
+
+
+def enable():
+    global enabled
+    enabled = True
+    update_instrumented()
+
+
+def disable():
+    global enabled
+    enabled = False
+    update_instrumented()
+
+
+def reset():
+    stats.clear()
+
+
+@contextmanager
+def profile():
+    """
+    Profile the components rendered within the block:
+        with profile():
+            html = template.render(context)
+        get_stats()
+    """
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+
+
+def get_stats():
+    """
+    Return the counters of the rendered components by name: calls, seconds
+    (cumulative), self_seconds (without the nested components),
+    resolve_seconds (arguments and blocks) and bytes of output.
+    """
+    components = {}
+    for (name, counter), value in stats.snapshot().items():
+        components.setdefault(name, dict.fromkeys(COUNTERS, 0))[counter] = value
+    return components
+
+
+def get_stack():
+    # time spent in the nested components of each component being rendered
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def record(node, seconds, self_seconds, resolve_seconds, output):
+    size = len(str(output).encode('utf-8'))
+    stats.add((node.name, 'calls'))
+    stats.add((node.name, 'seconds'), seconds)
+    stats.add((node.name, 'self_seconds'), self_seconds)
+    stats.add((node.name, 'resolve_seconds'), resolve_seconds)
+    stats.add((node.name, 'bytes'), size)
+    component_rendered.send(
+        sender=type(node), node=node, seconds=seconds, self_seconds=self_seconds,
+        resolve_seconds=resolve_seconds, bytes=size,
+    )
+
+
+def render(node, context):
+    """
+    Tag.render with profiling.
+    """
+    stack = get_stack()
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        kwargs = node.get_render_kwargs(context)
+        resolve_seconds = time.perf_counter() - start - stack[-1]
+        output = node.render_kwargs(context, kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        nested_seconds = stack.pop()
+        if stack:
+            stack[-1] += seconds
+    record(node, seconds, seconds - nested_seconds, resolve_seconds, output)
+    return output
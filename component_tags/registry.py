@@ -1,3 +1,8 @@
+from types import MappingProxyType
+
+from .exceptions import FrozenError
+
+
 class AlreadyRegistered(Exception):
     pass
 
@@ -9,11 +14,34 @@ class NotRegistered(Exception):
 class ComponentRegistry(object):
     def __init__(self):
         self._registry = {}  # component name -> component_class mapping
+        self.frozen = False
 
     def register(self, component):
         name = component.name
         if not name in self._registry:
-            self._registry[name] = component
+            if self.frozen:
+                raise FrozenError("The component '%s' is registered after freeze()" % name)
+            # the first component registered by concurrent threads wins
+            self._registry.setdefault(name, component)
+
+    def get(self, name):
+        """
+        Return the component class registered as name.
+        """
+        try:
+            component = self._registry[name]
+        except KeyError:
+            raise NotRegistered("No component is registered as '%s'" % name)
+        return component if isinstance(component, type) else type(component)
 
     def clear(self):
+        if self.frozen:
+            raise FrozenError("The registry can not be cleared after freeze()")
         self._registry = {}
+
+    def freeze(self):
+        """
+        Reject the registration of new components.
+        """
+        self._registry = MappingProxyType(dict(self._registry))
+        self.frozen = True
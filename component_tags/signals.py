@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from django.dispatch import Signal
+
+# Sent after each component render while profiling is enabled (see
+# component_tags.profiling), the sender is the component class.
+component_rendered = Signal(providing_args=['node', 'seconds', 'self_seconds', 'resolve_seconds', 'bytes'])
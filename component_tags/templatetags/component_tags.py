@@ -1,23 +1,24 @@
 from django import template
-from django.utils.safestring import mark_safe
 
 from component_tags.arguments import Argument, Flag, KeywordArgument
-from component_tags.core import registry
+from component_tags.core import get_dependencies_manifest, get_tracked_dependencies, render_dependencies
+from component_tags.parallel import ParallelNode, ParallelNodeList
 
 register = template.Library()
 
-@register.simple_tag(name="dependencies")
-def component_dependencies_tag():
-    registry_component = registry._registry
-    registry_component = { k: v for k, v in registry_component.items() }
-    registry.clear()
-    unique_component_classes = set(registry_component.values())
 
-    out = []
-    for component_class in unique_component_classes:
-        import_static_files = component_class.render_dependencies()
-        for import_static_file in import_static_files:
-            if not import_static_file in out:
-                out.append(import_static_file)
-    out.sort()
-    return mark_safe("\n".join(out) + "\n")
\ No newline at end of file
+@register.tag(name="parallel")
+def parallel_tag(parser, token):
+    """
+    Render the parallel components of the block concurrently:
+        {% parallel %}{% card a %}{% card b %}{% endparallel %}
+    """
+    nodelist = parser.parse(('endparallel',))
+    parser.delete_first_token()
+    return ParallelNode(ParallelNodeList(nodelist))
+
+
+@register.simple_tag(name="dependencies", takes_context=True)
+def component_dependencies_tag(context):
+    component_classes = get_dependencies_manifest(context.template) + get_tracked_dependencies()
+    return render_dependencies(component_classes)
\ No newline at end of file
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from django import template
+
+from component_tags import arguments, core
+
+register = template.Library()
+
+
+@register.tag
+class DiscoveredTag(core.Tag):
+    class Media:
+        template = 'tests/arguments.html'
+        css = ['/discovered.css']
+        js = []
+
+    name = "discovered"
+    options = core.Options(
+        arguments.Argument('myarg'),
+        arguments.KeywordArgument('mykwarg', required=False),
+        arguments.Flag('myflag'),
+    )
+
+
+register.tag(DiscoveredTag.for_tag())
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+from django import template
+
+from component_tags import autodiscover
+
+from .context_managers import SettingsOverride
+
+MODULE_NAME = 'component_tags.tests.autodiscover_components'
+
+
+class ComponentTagAutodiscoverTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'index.json')
+        self.settings = SettingsOverride(
+            COMPONENT_TAGS_AUTODISCOVER_MODULE='tests.autodiscover_components',
+            COMPONENT_TAGS_AUTODISCOVER_INDEX=self.path,
+        )
+        self.settings.__enter__()
+        sys.modules.pop(MODULE_NAME, None)
+
+    def tearDown(self):
+        self.settings.__exit__(None, None, None)
+        shutil.rmtree(self.directory)
+
+    def get_engine(self, library):
+        engine = template.Engine()
+        engine.template_builtins.append(library)
+        return engine
+
+    def test_index(self):
+        index = autodiscover.get_index()
+        self.assertEqual(list(index['modules']), [MODULE_NAME])
+        self.assertEqual(sorted(index['tags']), ['discovered', 'discovered_for'])
+        self.assertEqual(index['tags']['discovered'], {'module': MODULE_NAME})
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), index)
+
+    def test_lazy_import(self):
+        autodiscover.get_index()
+        sys.modules.pop(MODULE_NAME)
+
+        with mock.patch.object(autodiscover, 'get_index', wraps=autodiscover.get_index) as get_index:
+            library = autodiscover.ComponentLibrary()
+            engine = self.get_engine(library)
+            self.assertFalse(get_index.called)
+            engine.from_string("no components")
+            self.assertEqual(get_index.call_count, 1)
+        self.assertNotIn(MODULE_NAME, sys.modules)
+
+        tpl = engine.from_string("{% discovered 1 mykwarg='a' %}{% discovered_for rows as row row %}")
+        self.assertIn(MODULE_NAME, sys.modules)
+        self.assertEqual(
+            tpl.render(template.Context({'rows': [2]})),
+            "myarg = 1 / mykwarg = a / myflag is Falsemyarg = 2 / mykwarg =  / myflag is False",
+        )
+        module = sys.modules[MODULE_NAME]
+        self.assertIs(library.tags['discovered'], module.DiscoveredTag)
+
+    def test_default_index_path(self):
+        with SettingsOverride(COMPONENT_TAGS_AUTODISCOVER_INDEX=None):
+            path = autodiscover.get_index_path()
+        self.assertEqual(os.path.dirname(path), tempfile.gettempdir())
+
+    def test_unwritable_index(self):
+        path = os.path.join(self.directory, 'missing', 'index.json')
+        with self.assertWarnsRegex(RuntimeWarning, 'COMPONENT_TAGS_AUTODISCOVER_INDEX'):
+            index = autodiscover.get_index(path)
+        self.assertEqual(sorted(index['tags']), ['discovered', 'discovered_for'])
+
+    def test_stale_index(self):
+        index = autodiscover.get_index()
+        index['modules'][MODULE_NAME] -= 1
+        index['tags'] = {}
+        with open(self.path, 'w') as f:
+            json.dump(index, f)
+        self.assertEqual(sorted(autodiscover.get_index()['tags']), ['discovered', 'discovered_for'])
+
+    def test_moved_component(self):
+        index = autodiscover.get_index()
+        index['tags']['discovered']['module'] = 'component_tags.tests'
+        index['tags']['vanished'] = dict(index['tags']['discovered'])
+
+        library = autodiscover.ComponentLibrary(index)
+        engine = self.get_engine(library)
+        tpl = engine.from_string("{% discovered 1 %}")
+        self.assertEqual(tpl.render(template.Context()), "myarg = 1 / mykwarg =  / myflag is False")
+        self.assertEqual(library.index['tags']['discovered']['module'], MODULE_NAME)
+
+        with self.assertRaisesRegex(template.TemplateSyntaxError, "'vanished'"):
+            engine.from_string("{% vanished 1 %}")
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase, mock
+
+from django import template
+
+from component_tags import arguments, budget, core, fragments
+
+from .context_managers import SettingsOverride, TemplateTags
+
+
+class ComponentTagBudgetTests(TestCase):
+
+    def setUp(self):
+        fragments.get_cache().clear()
+        self.release = threading.Event()
+        self.done = threading.Event()
+        release, done = self.release, self.done
+
+        class SlowTag(core.Tag):
+            name = "slow"
+            render_timeout = 0.05
+            options = core.Options(
+                arguments.Argument('myarg'),
+            )
+
+            def render_tag(self, context, **kwargs):
+                if kwargs['myarg'] == 'fail':
+                    raise ValueError(kwargs['myarg'])
+                release.wait(5)
+                if kwargs['myarg'] == 'leak':
+                    context.set_upward('myarg', 'changed')
+                    done.set()
+                return "slow:%s" % kwargs['myarg']
+
+        self.tag = SlowTag
+        with TemplateTags(SlowTag):
+            self.tpl = template.Template("[{% slow myarg %}]")
+
+    def tearDown(self):
+        self.release.set()
+
+    def render(self, myarg='foo'):
+        return self.tpl.render(template.Context({'myarg': myarg}))
+
+    def test_render_within_budget(self):
+        self.release.set()
+        self.assertEqual(self.render(), "[slow:foo]")
+
+    def test_render_timeout(self):
+        before = budget.get_timeout_stats().get('slow', 0)
+        self.assertEqual(self.render(), "[]")
+        self.assertEqual(budget.get_timeout_stats()['slow'], before + 1)
+
+    def test_fallback_template(self):
+        self.tag.fallback_template = 'tests/arguments.html'
+        self.assertEqual(self.render(), "[myarg = foo / mykwarg =  / myflag is ]")
+
+    def test_timed_out_render_context(self):
+        context = template.Context({'myarg': 'leak'})
+        self.assertEqual(self.tpl.render(context), "[]")
+        self.release.set()
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(context['myarg'], 'leak')
+
+    def test_render_error(self):
+        with self.assertRaises(ValueError):
+            self.render('fail')
+
+    def test_warm_fragment_cache(self):
+        self.tag.cacheable = True
+        self.tag.render_timeout_warm = True
+        with fragments.batch() as fragment_batch:
+            self.assertEqual(fragment_batch.splice(self.render()), "[]")
+        self.release.set()
+        node = self.tag.new_node()
+        cache = fragments.get_cache()
+        key = node.get_cache_key({'myarg': 'foo'})
+        for _ in range(100):
+            if cache.get(key) is not None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.render(), "[slow:foo]")
+
+    def test_saturated_pool(self):
+        self.tag.cacheable = True
+        self.tag.render_timeout_warm = True
+        before = budget.get_dropped_stats().get('slow', 0)
+        threads = threading.active_count()
+        with SettingsOverride(COMPONENT_TAGS_BUDGET_WORKERS=2):
+            with mock.patch.object(budget, '_executor', None):
+                outputs = [self.render(str(i)) for i in range(4)]
+                self.assertEqual(outputs, ["[]"] * 4)
+                self.assertLessEqual(threading.active_count(), threads + 2)
+                self.release.set()
+                budget.get_executor()[0].shutdown(wait=True)
+        self.assertEqual(budget.get_dropped_stats()['slow'], before + 2)
+
+    def test_fallback_not_cached(self):
+        self.tag.cacheable = True
+        self.assertEqual(self.render(), "[]")
+        self.release.set()
+        self.assertEqual(self.render(), "[slow:foo]")
@@ -3,8 +3,9 @@ from unittest import TestCase
 
 from django import template
 from django.template import Context
+from django.utils.safestring import mark_safe
 
-from component_tags import arguments, core, exceptions, utils, values
+from component_tags import arguments, core, exceptions, registry, utils, values
 
 from .context_managers import SettingsOverride, TemplateTags
 
@@ -1573,3 +1574,315 @@ class ComponentTagRenderTests(TestCase):
             othertest='foo'
         )
         self.assertEqual(output, expected_output)
+
+    def test_render_many(self):
+        class TestTag(core.Tag):
+            class Media:
+                template = 'tests/arguments.html'
+                css = []
+                js = []
+
+            name="test"
+            options =  core.Options(
+                arguments.Argument('myarg'),
+                arguments.KeywordArgument('mykwarg', required=False),
+                arguments.Flag('myflag'),
+            )
+
+        output = TestTag.render_many([
+            {'myarg': 'foo', 'mykwarg': 1, 'myflag': True},
+            {'myarg': 'bar', 'mykwarg': 2},
+        ])
+        expected_output = "myarg = foo / mykwarg = 1 / myflag is Truemyarg = bar / mykwarg = 2 / myflag is False"
+        self.assertEqual(output, expected_output)
+
+        with self.assertRaises(exceptions.ArgumentRequiredError):
+            TestTag.render_many([{'mykwarg': 1}])
+        with self.assertRaises(exceptions.TooManyArguments):
+            TestTag.render_many([{'myarg': 'foo', 'other': 1}])
+
+    def test_render_for_tag(self):
+        class TestTag(core.Tag):
+            class Media:
+                template = 'tests/arguments.html'
+                css = []
+                js = []
+
+            name="test"
+            options =  core.Options(
+                arguments.Argument('myarg'),
+                arguments.KeywordArgument('mykwarg'),
+                arguments.Flag('myflag'),
+            )
+
+        with TemplateTags(TestTag.for_tag()):
+            ctx = template.Context({
+                "rows": [{"a": 1, "b": "foo"}, {"a": 2, "b": "bar"}],
+                "flag": True,
+            })
+            tpl = template.Template(
+                "{% test_for rows as row row.a mykwarg=row.b myflag=flag %}"
+            )
+
+        output = tpl.render(ctx)
+        expected_output = "myarg = 1 / mykwarg = foo / myflag is Truemyarg = 2 / mykwarg = bar / myflag is True"
+        self.assertEqual(output, expected_output)
+        self.assertNotIn("row", ctx)
+
+    def test_render_for_tag_with_render_tag(self):
+        class TestTag(core.Tag):
+            name="test"
+            options =  core.Options(
+                arguments.Argument('myarg'),
+                blocks=[('endtest_for', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                return "{}:{};".format(kwargs["myarg"], kwargs["content"])
+
+        with TemplateTags(TestTag.for_tag()):
+            ctx = template.Context({"rows": ["a", "b"]})
+            tpl = template.Template(
+                "{% test_for rows as row row %}<{{ row }}>{% endtest_for %}"
+            )
+
+        output = tpl.render(ctx)
+        self.assertEqual(output, "a:<a>;b:<b>;")
+
+    def test_render_for_tag_without_loop_should_not_pass(self):
+        class TestTag(core.Tag):
+            name="test"
+
+        with self.assertRaises(exceptions.LoopSyntaxError):
+            with TemplateTags(TestTag.for_tag()):
+                template.Template("{% test_for rows %}")
+
+
+class ComponentTagNodeTests(TestCase):
+
+    def test_compact_values(self):
+        argument = arguments.KeywordArgument('mykwarg', choices=['foo', 'bar'])
+        value = argument.value_class(utils.TemplateConstant("'foo'"))
+        self.assertFalse(hasattr(value, '__dict__'))
+        self.assertFalse(hasattr(argument, '__dict__'))
+        self.assertFalse(hasattr(value.var, '__dict__'))
+        self.assertEqual(value.literal, "'foo'")
+        self.assertEqual(value.resolve({}), 'foo')
+
+    def test_block_nodelists(self):
+        class TestTag(core.Tag):
+            name="test"
+            options = core.Options(
+                blocks=[('middle', 'before'), ('endtest', 'after')]
+            )
+
+        with TemplateTags(TestTag):
+            tpl = template.Template(
+                "{% test %}{% test %}{% endtest %}{% middle %}b{% endtest %}"
+            )
+        node = tpl.nodelist[0]
+        self.assertEqual(node.child_nodelists, ('before', 'after'))
+        self.assertIs(node.before, node.blocks['before'])
+        self.assertNotIn('before', node.__dict__)
+        self.assertEqual(len(tpl.nodelist.get_nodes_by_type(TestTag)), 2)
+        with self.assertRaises(AttributeError):
+            node.missing
+
+
+class ComponentTagRenderComponentTests(TestCase):
+
+    def setUp(self):
+        class RenderComponentTag(core.Tag):
+            class Media:
+                template = 'tests/arguments.html'
+                css = ['/foo.css']
+                js = []
+
+            name = "render_component_test"
+            options = core.Options(
+                arguments.Argument('myarg'),
+                arguments.KeywordArgument('mykwarg', default="'baz'", required=False),
+                arguments.Flag('myflag'),
+            )
+
+        class BlockComponentTag(core.Tag):
+            name = "render_component_blocks"
+            options = core.Options(
+                arguments.Argument('count', value_class=values.IntegerValue),
+                blocks=[('endrender_component_blocks', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                return "%s:%s" % (kwargs['count'], kwargs['content'])
+
+        self.tag = RenderComponentTag
+        self.block_tag = BlockComponentTag
+
+    def test_render_component(self):
+        output = self.tag.render_component({}, myarg='foo', myflag=True)
+        self.assertEqual(output, "myarg = foo / mykwarg = baz / myflag is True")
+        output = self.tag.render_component(Context(), myarg='<foo>', mykwarg='bar')
+        self.assertEqual(output, "myarg = &lt;foo&gt; / mykwarg = bar / myflag is False")
+
+    def test_render_component_validates_values(self):
+        self.assertEqual(self.block_tag.render_component(count='3', content='<b>'), "3:&lt;b&gt;")
+        self.assertEqual(self.block_tag.render_component(count=1, content=mark_safe('<b>')), "1:<b>")
+        self.assertEqual(self.block_tag.render_component(count=1), "1:")
+
+    def test_render_component_errors(self):
+        with self.assertRaises(exceptions.ArgumentRequiredError):
+            self.tag.render_component(mykwarg='bar')
+        with self.assertRaises(exceptions.TooManyArguments):
+            self.tag.render_component(myarg='foo', other='bar')
+
+    def test_registry_get(self):
+        self.tag.render_component(myarg='foo')
+        self.assertIs(core.registry.get('render_component_test'), self.tag)
+        with self.assertRaises(registry.NotRegistered):
+            core.registry.get('render_component_missing')
+
+    def test_track_dependencies(self):
+        with core.track_dependencies() as component_classes:
+            self.tag.render_component(myarg='foo')
+        self.assertEqual(component_classes, set([self.tag]))
+        self.assertEqual(
+            core.render_dependencies(component_classes),
+            '<link href="/foo.css" type="text/css" rel="stylesheet" />\n'
+        )
+        self.assertEqual(core.get_tracked_dependencies(), [])
+
+
+class ComponentTagInlineTests(TestCase):
+
+    def setUp(self):
+        class InlineTag(core.Tag):
+            class Media:
+                template = 'tests/arguments.html'
+                css = []
+                js = []
+
+            name = "inline_test"
+            inline = True
+            options = core.Options(
+                arguments.Argument('myarg'),
+                arguments.KeywordArgument('mykwarg', required=False),
+            )
+
+        self.tag = InlineTag
+
+    def render(self, source, context):
+        with TemplateTags(self.tag):
+            tpl = template.Template(source)
+        return tpl, tpl.render(Context(context))
+
+    def test_inline(self):
+        tpl, output = self.render(
+            "{% for i in items %}{% inline_test i mykwarg=myflag %}{% endfor %}",
+            {'items': ['<a>', 'b'], 'myflag': 'x'},
+        )
+        self.assertEqual(
+            output,
+            "myarg = &lt;a&gt; / mykwarg = x / myflag is "
+            "myarg = b / mykwarg = x / myflag is "
+        )
+        node = tpl.nodelist.get_nodes_by_type(self.tag)[0]
+        self.assertIn('inline_nodelist', node.child_nodelists)
+        self.assertIs(node.inline_nodelist, self.tag.get_template().template.nodelist)
+
+    def test_inline_disabled_in_debug(self):
+        with SettingsOverride(DEBUG=True):
+            tpl, output = self.render("{% inline_test 'a' %}", {})
+        self.assertEqual(output, "myarg = a / mykwarg =  / myflag is ")
+        self.assertNotIn('inline_nodelist', tpl.nodelist[0].__dict__)
+
+    def test_inline_fingerprint(self):
+        fingerprint = self.tag.get_fingerprint()
+        self.assertTrue(fingerprint.startswith(self.tag.options.fingerprint()))
+        self.tag.inline = False
+        self.assertEqual(self.tag.get_fingerprint(), self.tag.options.fingerprint())
+        self.assertNotEqual(self.tag.get_fingerprint(), fingerprint)
+
+
+class ComponentTagTemplateStringTests(TestCase):
+
+    def setUp(self):
+        class BadgeTag(core.Tag):
+            class Media:
+                template_string = '<span class="badge">{{ label }}</span>'
+                css = ['/badge.css']
+                js = []
+                inline_css = '.badge { color: red; }\n'
+                inline_js = 'badges();'
+
+            name = "badge_test"
+            options = core.Options(
+                arguments.Argument('label'),
+            )
+
+        class LabelTag(core.Tag):
+            class Media:
+                template_string = '{% badge_test label %}!'
+                css = []
+                js = []
+                inline_css = '.badge { color: red; }'
+                inline_js = 'labels();'
+
+            name = "label_test"
+            options = core.Options(
+                arguments.Argument('label'),
+            )
+
+        self.tags = (BadgeTag, LabelTag)
+
+    def test_template_string(self):
+        BadgeTag, LabelTag = self.tags
+        with TemplateTags(*self.tags):
+            with SettingsOverride(DEBUG=True):
+                tpl = template.Template("{% badge_test value %}{% label_test 'b' %}")
+                output = tpl.render(Context({'value': '<a>'}))
+                # compiled once, even in debug mode
+                self.assertIs(BadgeTag.get_template(), BadgeTag.get_template())
+        self.assertEqual(output, '<span class="badge">&lt;a&gt;</span><span class="badge">b</span>!')
+        self.assertTrue(BadgeTag.has_template())
+        self.assertEqual(core.get_dependencies_manifest(tpl), [BadgeTag, LabelTag])
+
+    def test_inline_dependencies(self):
+        with TemplateTags(*self.tags):
+            tpl = template.Template(
+                "{% load component_tags %}{% dependencies %}{% label_test 'a' %}{% badge_test 'b' %}"
+            )
+            output = tpl.render(Context())
+        self.assertEqual(output, "\n".join([
+            '<link href="/badge.css" type="text/css" rel="stylesheet" />',
+            '<style type="text/css">\n.badge { color: red; }\n</style>',
+            '<script type="text/javascript">\nlabels();\nbadges();\n</script>',
+            '<span class="badge">a</span>!<span class="badge">b</span>',
+        ]))
+
+
+class ComponentTagRenderPathTests(TestCase):
+
+    def test_plain_render_path(self):
+        class TestTag(core.Tag):
+            name = "render_path"
+
+        class ChildTag(TestTag):
+            name = "render_path_child"
+
+        class OverrideTag(core.Tag):
+            name = "render_path_override"
+
+            def render_content(self, context, kwargs):
+                return ''
+
+        self.assertTrue(TestTag._plain_render)
+        self.assertFalse(OverrideTag._plain_render)
+
+        TestTag.memoize = True
+        self.assertFalse(TestTag._plain_render)
+        self.assertFalse(ChildTag._plain_render)
+        del TestTag.memoize
+        self.assertTrue(ChildTag._plain_render)
+        ChildTag.render_timeout = 1
+        self.assertFalse(ChildTag._plain_render)
+        self.assertTrue(TestTag._plain_render)
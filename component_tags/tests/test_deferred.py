@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import datetime
+import re
+import uuid
+from decimal import Decimal
+from html import unescape
+from unittest import TestCase, mock
+
+from django import template
+from django.core import signing
+from django.http import Http404
+from django.test import RequestFactory
+
+from component_tags import arguments, core, deferred, fragments, views
+from component_tags.views import component
+
+from .context_managers import SettingsOverride, TemplateTags
+
+
+class DeferredTag(core.Tag):
+    name = "deferred_test"
+    deferred = True
+    options = core.Options(
+        arguments.Argument('myarg'),
+        blocks=[('enddeferred_test', 'content')],
+    )
+
+    def render_tag(self, context, **kwargs):
+        return "{}:{}".format(kwargs['myarg'], kwargs['content'])
+
+
+class ComponentTagDeferredTests(TestCase):
+
+    def setUp(self):
+        self.settings = SettingsOverride(ROOT_URLCONF='component_tags.tests.urls')
+        self.settings.__enter__()
+        with TemplateTags(DeferredTag):
+            self.tpl = template.Template(
+                "{% deferred_test 'foo' %}<b>{{ x }}</b>{% enddeferred_test %}"
+                "{% deferred_test 'bar' %}{% enddeferred_test %}"
+            )
+
+    def tearDown(self):
+        self.settings.__exit__(None, None, None)
+
+    def get_urls(self, output):
+        return [unescape(url) for url in re.findall('data-component-src="([^"]+)"', output)]
+
+    def get(self, url, **extra):
+        path, query = url.split('?')
+        request = RequestFactory().get(url, **extra)
+        return component(request, path.split('/')[-2])
+
+    def test_placeholder(self):
+        output = self.tpl.render(template.Context({'x': '<i>'}))
+        self.assertEqual(output.count('class="component-deferred"'), 2)
+        self.assertEqual(output.count(deferred.LOADER_SCRIPT), 2)
+        self.assertTrue(all(url.startswith('/components/deferred_test/?a=') for url in self.get_urls(output)))
+
+    def test_cached_fragment(self):
+        class WrapperTag(core.Tag):
+            name = "deferred_wrapper"
+            cacheable = True
+
+            class Media:
+                template_string = "[{% deferred_test 'nested' %}{% enddeferred_test %}]"
+                css = []
+                js = []
+
+        fragments.get_cache().clear()
+        with TemplateTags(DeferredTag, WrapperTag):
+            WrapperTag.get_template()
+            page_a = template.Template("{% deferred_test 'first' %}{% enddeferred_test %}{% deferred_wrapper %}")
+            page_b = template.Template("{% deferred_wrapper %}")
+        for page in [page_a, page_b]:
+            output = page.render(template.Context({}))
+            # the page B gets the fragment cached by the page A
+            self.assertEqual(output.count('class="component-deferred"'), output.count(deferred.LOADER_SCRIPT))
+        self.assertEqual(output.count(deferred.LOADER_SCRIPT), 1)
+
+    def test_fallback_template(self):
+        DeferredTag.fallback_template = 'tests/arguments.html'
+        try:
+            output = self.tpl.render(template.Context({}))
+        finally:
+            DeferredTag.fallback_template = None
+        self.assertIn('>myarg = foo / mykwarg =  / myflag is </div>', output)
+
+    def test_view(self):
+        urls = self.get_urls(self.tpl.render(template.Context({'x': '<i>'})))
+        response = self.get(urls[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"foo:<b>&lt;i&gt;</b>")
+        self.assertEqual(self.get(urls[1]).content, b"bar:")
+
+        not_modified = self.get(urls[0], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_view_fresh_worker(self):
+        url = self.get_urls(self.tpl.render(template.Context({})))[0]
+        with mock.patch.object(core.registry, '_registry', {}):
+            with mock.patch.object(views, '_component_classes', {}):
+                self.assertEqual(self.get(url).content, b"foo:<b></b>")
+                with self.assertRaises(Http404):
+                    self.get('/components/missing/?a=x')
+
+    def test_serializer(self):
+        kwargs = {
+            'when': datetime.datetime(2020, 1, 2, 3, 4, 5, 6789, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2020, 1, 2),
+            'at': datetime.time(3, 4, 5, 6789),
+            'delay': datetime.timedelta(days=1, seconds=2),
+            'price': Decimal('1.50'),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'nested': {'items': [Decimal('2'), 'a', None, True]},
+        }
+        serializer = deferred.ArgumentSerializer()
+        decoded = serializer.loads(serializer.dumps(kwargs))
+        self.assertEqual(decoded, kwargs)
+        self.assertEqual([type(decoded[key]) for key in sorted(kwargs)], [type(kwargs[key]) for key in sorted(kwargs)])
+
+    def test_unserializable_argument(self):
+        with self.assertRaisesRegex(TypeError, "'myarg' of the deferred component 'deferred_test'"):
+            deferred.get_url(DeferredTag.new_node(), {'myarg': object(), 'content': ''})
+
+    def test_view_bad_signature(self):
+        url = self.get_urls(self.tpl.render(template.Context({})))[0]
+        self.assertEqual(self.get(url + 'x').status_code, 400)
+
+    def test_view_token_of_another_component(self):
+        url = self.get_urls(self.tpl.render(template.Context({})))[0]
+        with self.assertRaises(signing.BadSignature):
+            deferred.load_kwargs('other', url.split('a=')[1])
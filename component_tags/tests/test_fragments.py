@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+import datetime
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import TestCase, mock
+
+from django import template
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection, models
+from django.http import HttpResponse
+from django.template import engines, loader
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.test import RequestFactory
+
+from component_tags import arguments, core, exceptions, fragments
+
+from .context_managers import SettingsOverride, TemplateTags
+
+
+class Product(models.Model):
+    name = models.CharField(max_length=20)
+
+    class Meta:
+        app_label = 'component_tags'
+
+
+class ComponentTagFragmentTests(TestCase):
+    source = (
+        "{% card 1 %}a{% endcard %}{% card 2 %}b{% endcard %}{% card 1 %}a{% endcard %}"
+        "{% card 3 %}{% card 4 %}c{% endcard %}{% endcard %}"
+    )
+
+    def setUp(self):
+        fragments.get_cache().clear()
+        self.calls = []
+        calls = self.calls
+
+        class CardTag(core.Tag):
+            name = "card"
+            cacheable = True
+            options = core.Options(
+                arguments.Argument('myarg'),
+                blocks=[('endcard', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                calls.append(kwargs['myarg'])
+                return "<{}:{}>".format(kwargs['myarg'], kwargs['content'])
+
+        with TemplateTags(CardTag):
+            self.tpl = template.Template(self.source)
+
+    def render(self):
+        with fragments.batch() as fragment_batch:
+            output = self.tpl.render(template.Context({}))
+            self.assertRegex(output, fragments.PLACEHOLDER_RE)
+            return fragment_batch, fragment_batch.splice(output)
+
+    def test_batch(self):
+        cache = fragments.get_cache()
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+                fragment_batch, output = self.render()
+        expected_output = "<1:a><2:b><1:a><3:<4:c>>"
+        self.assertEqual(output, expected_output)
+        self.assertEqual(sorted(self.calls), [1, 2, 3, 4])
+        # the nested card is fetched when its parent is rendered
+        self.assertEqual(get_many.call_count, 2)
+        self.assertEqual(set_many.call_count, 2)
+        self.assertEqual(fragment_batch.misses, 4)
+
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            fragment_batch, output = self.render()
+        self.assertEqual(output, expected_output)
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(fragment_batch.hits, 3)
+
+    def test_nested_placeholders(self):
+        # the placeholder of the nested card is part of the key of its parent
+        with TemplateTags(type(self.tpl.nodelist[0])):
+            page_a = template.Template("{% card 3 %}{% card 4 %}c{% endcard %}{% endcard %}")
+            page_b = template.Template("{% card 3 %}{% card 5 %}d{% endcard %}{% endcard %}")
+        for page, expected_output in [(page_a, "<3:<4:c>>"), (page_b, "<3:<5:d>>"), (page_a, "<3:<4:c>>")]:
+            with fragments.batch() as fragment_batch:
+                output = fragment_batch.splice(page.render(template.Context({})))
+            self.assertEqual(output, expected_output)
+        self.assertEqual(self.calls, [3, 4, 3, 5])
+
+    def test_without_batch(self):
+        expected_output = "<1:a><2:b><1:a><3:<4:c>>"
+        self.assertEqual(self.tpl.render(template.Context({})), expected_output)
+        self.assertEqual(self.calls, [1, 2, 4, 3])
+        self.assertEqual(self.tpl.render(template.Context({})), expected_output)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_file_backend(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = FileBasedCache(cache_dir, {})
+            with mock.patch.object(fragments, 'get_cache', return_value=cache):
+                self.render()
+                fragment_batch, output = self.render()
+        finally:
+            shutil.rmtree(cache_dir)
+        self.assertEqual(output, "<1:a><2:b><1:a><3:<4:c>>")
+        self.assertEqual(len(self.calls), 4)
+
+    def get_response(self, source, context=None, content_type=None):
+        with TemplateTags(type(self.tpl.nodelist[0])):
+            backend_template = engines['django'].from_string(source)
+
+        def view(request):
+            return TemplateResponse(request, backend_template, context, content_type=content_type)
+
+        # as done by the request handler
+        request = RequestFactory().get('/')
+        middleware = fragments.FragmentCacheMiddleware(view)
+        response = middleware.process_template_response(request, middleware(request))
+        return response.render()
+
+    def test_middleware(self):
+        cache = fragments.get_cache()
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            response = self.get_response(self.source)
+        self.assertEqual(response.content, b"<1:a><2:b><1:a><3:<4:c>>")
+        self.assertEqual(get_many.call_count, 2)
+
+    def test_middleware_not_html(self):
+        response = self.get_response(self.source, content_type='application/json')
+        self.assertNotIsInstance(response.template_name, fragments.BatchedTemplate)
+        self.assertEqual(response.content, b"<1:a><2:b><1:a><3:<4:c>>")
+
+    def test_middleware_without_template_response(self):
+        def view(request):
+            return HttpResponse(render_to_string('tests/foo.html') + self.tpl.render(template.Context({})))
+
+        response = fragments.FragmentCacheMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b"foo<1:a><2:b><1:a><3:<4:c>>")
+
+    def test_filtered_components(self):
+        cache = fragments.get_cache()
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            response = self.get_response(
+                "{% for i in items %}{% card i %}a{% endcard %}{% endfor %}"
+                "{% filter upper %}{% card 5 %}b{% endcard %}{% endfilter %}",
+                {'items': [1, 2]},
+            )
+        self.assertEqual(response.content, b"<1:a><2:a><5:B>")
+        self.assertEqual(get_many.call_count, 1)
+
+    def test_render_to_string(self):
+        with TemplateTags(type(self.tpl.nodelist[0])):
+            with mock.patch.object(loader, 'get_template', return_value=engines['django'].from_string(self.source)):
+                output = fragments.render_to_string('card.html')
+        self.assertEqual(output, "<1:a><2:b><1:a><3:<4:c>>")
+        self.assertIsNone(fragments.get_batch())
+
+    def test_make_key_part(self):
+        self.assertEqual(fragments.make_key_part({'b': [1, 'a'], 'a': None}), "{'a':None,'b':[1,'a']}")
+        self.assertEqual(fragments.make_key_part(Decimal('1.50')), "Decimal('1.50')")
+        self.assertEqual(fragments.make_key_part(datetime.date(2020, 1, 2)), "date:2020-01-02")
+        self.assertEqual(fragments.make_key_part(Product(pk=3)), "component_tags.product:3")
+        self.assertNotEqual(fragments.make_key_part(True), fragments.make_key_part(1))
+        with self.assertRaises(exceptions.UncacheableArgument):
+            fragments.make_key_part([object()])
+
+    def test_uncacheable_argument(self):
+        node = self.tpl.nodelist[0]
+        with mock.patch.object(core.Options, 'fingerprint', autospec=True, return_value='0' * 40) as fingerprint:
+            self.assertEqual(node.get_cache_key({'myarg': 1}), node.get_cache_key({'myarg': 1}))
+        self.assertEqual(fingerprint.call_count, 1)
+
+        output = fragments.render(node, template.Context({}), {'myarg': object, 'content': 'a'})
+        self.assertEqual(output, "<{}:a>".format(object))
+        output = fragments.render(node, template.Context({}), {'myarg': object, 'content': 'a'})
+        self.assertEqual(self.calls, [object, object])
+
+
+class ComponentTagInvalidationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(ComponentTagInvalidationTests, cls).setUpClass()
+        if Product._meta.db_table not in connection.introspection.table_names():
+            with connection.schema_editor() as schema_editor:
+                schema_editor.create_model(Product)
+
+    def setUp(self):
+        fragments.get_cache().clear()
+        self.calls = []
+        calls = self.calls
+
+        class ProductTag(core.Tag):
+            name = "product"
+            cacheable = True
+            cache_models = [(Product, 'product')]
+            options = core.Options(
+                arguments.Argument('product'),
+            )
+
+            def render_tag(self, context, **kwargs):
+                calls.append(kwargs['product'].pk)
+                return "<{}>".format(kwargs['product'].name)
+
+        class ProductCountTag(core.Tag):
+            name = "product_count"
+            cacheable = True
+            cache_models = ['component_tags.Product']
+
+            def render_tag(self, context, **kwargs):
+                calls.append('count')
+                return "<{}>".format(Product.objects.count())
+
+        class BoxTag(core.Tag):
+            name = "box"
+            cacheable = True
+            options = core.Options(
+                blocks=[('endbox', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                calls.append('box')
+                return "[{}]".format(kwargs['content'])
+
+        self.tags = (ProductTag, BoxTag)
+        with TemplateTags(ProductTag, ProductCountTag):
+            self.tpl = template.Template("{% product_count %}{% for p in products %}{% product p %}{% endfor %}")
+
+    def render(self):
+        products = list(Product.objects.order_by('pk'))
+        with fragments.batch() as fragment_batch:
+            output = self.tpl.render(template.Context({'products': products}))
+            return fragment_batch.splice(output)
+
+    def test_invalidate_on_save_and_delete(self):
+        a = Product.objects.create(name='a')
+        b = Product.objects.create(name='b')
+        try:
+            self.assertEqual(self.render(), "<2><a><b>")
+            self.assertEqual(self.render(), "<2><a><b>")
+            self.assertEqual(self.calls, ['count', a.pk, b.pk])
+
+            count = fragments.invalidations['component_tags.product']
+            a.name = 'c'
+            a.save()
+            self.assertEqual(self.render(), "<2><c><b>")
+            self.assertEqual(self.calls, ['count', a.pk, b.pk, 'count', a.pk])
+
+            b.delete()
+            self.assertEqual(self.render(), "<1><c>")
+            self.assertEqual(fragments.invalidations['component_tags.product'], count + 2)
+            stats = fragments.get_invalidation_stats()['component_tags.product']
+            self.assertEqual(stats['count'], count + 2)
+            self.assertGreater(stats['rate'], 0)
+        finally:
+            Product.objects.all().delete()
+
+    def test_invalidate_nested(self):
+        a = Product.objects.create(name='a')
+        try:
+            with TemplateTags(*self.tags):
+                self.tpl = template.Template("{% box %}{% product products.0 %}{% endbox %}")
+            self.assertEqual(self.render(), "[<a>]")
+            self.assertEqual(self.render(), "[<a>]")
+            a.name = 'c'
+            a.save()
+            self.assertEqual(self.render(), "[<c>]")
+            self.assertEqual(self.calls, ['box', a.pk, 'box', a.pk])
+        finally:
+            Product.objects.all().delete()
+
+    def test_versions_without_batch(self):
+        a = Product.objects.create(name='a')
+        try:
+            context = template.Context({'products': [a]})
+            self.assertEqual(self.tpl.render(context), "<1><a>")
+            self.assertEqual(self.tpl.render(context), "<1><a>")
+            Product.objects.create(name='b')
+            self.assertEqual(self.tpl.render(context), "<2><a>")
+            self.assertEqual(self.calls, ['count', a.pk, 'count'])
+        finally:
+            Product.objects.all().delete()
+
+
+class ComponentTagStaleTests(TestCase):
+
+    def setUp(self):
+        fragments.get_cache().clear()
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        calls, release = self.calls, self.release
+
+        class DashboardTag(core.Tag):
+            name = "dashboard"
+            cacheable = True
+            cache_timeout = 60
+            cache_stale_timeout = 60
+
+            def render_tag(self, context, **kwargs):
+                release.wait(5)
+                calls.append(len(calls))
+                return "<{}>".format(len(calls))
+
+        self.tag = DashboardTag
+        with TemplateTags(DashboardTag):
+            self.tpl = template.Template("{% dashboard %}")
+
+    def make_stale(self):
+        cache = fragments.get_cache()
+        key = self.tag.new_node().get_cache_key({})
+        entry = cache.get(key)
+        cache.set(key, (time.time() - 1, entry[1]), 60)
+
+    def wait_refresh(self):
+        for thread in threading.enumerate():
+            if thread.name == 'component_tags-refresh':
+                thread.join(5)
+
+    def test_stale_while_revalidate(self):
+        self.assertEqual(self.tpl.render(template.Context({})), "<1>")
+        self.make_stale()
+        self.release.clear()
+        self.assertEqual(self.tpl.render(template.Context({})), "<1>")
+        self.assertEqual(self.tpl.render(template.Context({})), "<1>")
+        self.release.set()
+        self.wait_refresh()
+        self.assertEqual(self.calls, [0, 1])
+        self.assertEqual(self.tpl.render(template.Context({})), "<2>")
+
+    def test_stale_in_batch(self):
+        self.tpl.render(template.Context({}))
+        self.make_stale()
+        with fragments.batch() as fragment_batch:
+            output = fragment_batch.splice(self.tpl.render(template.Context({})))
+        self.wait_refresh()
+        self.assertEqual(output, "<1>")
+        self.assertEqual(fragment_batch.stale, 1)
+        self.assertEqual(self.tpl.render(template.Context({})), "<2>")
+
+    def test_single_flight(self):
+        self.release.clear()
+        outputs = []
+
+        def render():
+            outputs.append(self.tpl.render(template.Context({})))
+
+        threads = [threading.Thread(target=render) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(outputs, ["<1>", "<1>", "<1>"])
+        self.assertEqual(self.calls, [0])
+
+
+class ComponentTagCompressionTests(TestCase):
+
+    def setUp(self):
+        fragments.get_cache().clear()
+
+        class ListTag(core.Tag):
+            name = "list"
+            cacheable = True
+            options = core.Options(
+                arguments.Argument('size'),
+            )
+
+            def render_tag(self, context, **kwargs):
+                return "<li>item</li>" * kwargs['size']
+
+        self.tag = ListTag
+        with TemplateTags(ListTag):
+            self.tpl = template.Template("{% list 2 %}{% list 100 %}")
+
+    def get_entries(self):
+        cache = fragments.get_cache()
+        node = self.tag.new_node()
+        return [cache.get(node.get_cache_key({'size': size}))[1] for size in (2, 100)]
+
+    def test_compress_above_threshold(self):
+        with SettingsOverride(COMPONENT_TAGS_CACHE_COMPRESS_THRESHOLD=100):
+            expected_output = "<li>item</li>" * 102
+            with fragments.batch() as fragment_batch:
+                self.assertEqual(fragment_batch.splice(self.tpl.render(template.Context({}))), expected_output)
+            small, large = self.get_entries()
+            self.assertIsInstance(small, str)
+            self.assertIsInstance(large, bytes)
+            self.assertEqual(self.tpl.render(template.Context({})), expected_output)
+
+        stats = fragments.get_compression_stats()['list']
+        self.assertEqual(stats['stored'], 1)
+        self.assertGreater(stats['ratio'], 10)
+        self.assertIsNotNone(stats['seconds_per_hit'])
+
+    def test_compress_threshold_per_component(self):
+        self.tag.cache_compress_threshold = 10
+        self.tpl.render(template.Context({}))
+        self.assertEqual([type(entry) for entry in self.get_entries()], [bytes, bytes])
+
+    def test_no_compression_by_default(self):
+        self.tpl.render(template.Context({}))
+        self.assertEqual([type(entry) for entry in self.get_entries()], [str, str])
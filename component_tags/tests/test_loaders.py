@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from django import template
+
+from component_tags import arguments, core, precompile
+
+from .context_managers import SettingsOverride
+
+register = template.Library()
+
+
+@register.tag
+class PersistentTag(core.Tag):
+    class Media:
+        template = 'tests/arguments.html'
+        css = []
+        js = []
+
+    name = "persistent"
+    options = core.Options(
+        arguments.Argument('myarg'),
+        arguments.KeywordArgument('mykwarg', choices=['foo', 'bar']),
+        arguments.Flag('myflag'),
+    )
+
+
+class PersistentLoaderTests(TestCase):
+    source = (
+        "{% if myval == 1 %}{% persistent myval mykwarg='bar' myflag %}{% endif %}"
+        "{% persistent_for rows as row row|upper mykwarg='foo' %}"
+    )
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.templates_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.templates_dir, 'page.html'), 'w') as f:
+            f.write(self.source)
+        register.tag(PersistentTag.for_tag())
+        self.settings = SettingsOverride(COMPONENT_TAGS_TEMPLATE_CACHE_DIR=self.cache_dir)
+        self.settings.__enter__()
+
+    def tearDown(self):
+        self.settings.__exit__(None, None, None)
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.templates_dir)
+
+    def get_engine(self):
+        return template.Engine(
+            dirs=[self.templates_dir],
+            builtins=['component_tags.tests.test_loaders'],
+            loaders=[('component_tags.loaders.PersistentLoader', ['django.template.loaders.filesystem.Loader'])],
+        )
+
+    def render(self, engine):
+        tpl = engine.get_template('page.html')
+        return tpl, tpl.render(template.Context({'myval': 1, 'rows': ['a']}))
+
+    def test_load_from_disk(self):
+        tpl, output = self.render(self.get_engine())
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        compile_nodelist = template.Template.compile_nodelist
+        template.Template.compile_nodelist = None
+        try:
+            loaded_tpl, loaded_output = self.render(self.get_engine())
+        finally:
+            template.Template.compile_nodelist = compile_nodelist
+        self.assertEqual(loaded_output, output)
+        self.assertEqual(loaded_output, "myarg = 1 / mykwarg = bar / myflag is Truemyarg = A / mykwarg = foo / myflag is False")
+        self.assertIs(loaded_tpl.origin, loaded_tpl.nodelist[0].origin)
+
+    def test_invalidate_on_source_change(self):
+        self.render(self.get_engine())
+        with open(os.path.join(self.templates_dir, 'page.html'), 'w') as f:
+            f.write("changed")
+        tpl, output = self.render(self.get_engine())
+        self.assertEqual(output, "changed")
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_invalidate_on_options_change(self):
+        self.render(self.get_engine())
+        options = PersistentTag.options
+        PersistentTag.options = core.Options(
+            arguments.Argument('myarg'),
+            arguments.KeywordArgument('mykwarg', choices=['foo', 'bar', 'baz']),
+            arguments.Flag('myflag'),
+        )
+        try:
+            compile_nodelist = template.Template.compile_nodelist
+            compiled = []
+
+            def spy(tpl):
+                compiled.append(tpl)
+                return compile_nodelist(tpl)
+            template.Template.compile_nodelist = spy
+            try:
+                self.render(self.get_engine())
+            finally:
+                template.Template.compile_nodelist = compile_nodelist
+        finally:
+            PersistentTag.options = options
+        self.assertEqual(len(compiled), 1)
+
+    def test_warmup_with_processes(self):
+        engine = self.get_engine()
+        reports = precompile.warmup(engine, template_names=['page.html'], processes=2)
+        self.assertEqual(reports[0].name, 'page.html')
+        self.assertIsNone(reports[0].error)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
+class IndexedLoaderTests(TestCase):
+
+    def setUp(self):
+        self.dirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        for directory in self.dirs:
+            os.makedirs(os.path.join(directory, 'components', 'cards'))
+        self.write(0, 'components/cards/card.html', "first card")
+        self.write(1, 'components/cards/card.html', "second card")
+        self.write(1, 'components/badge.html', "badge")
+        self.write(0, 'page.html', "page")
+
+    def tearDown(self):
+        for directory in self.dirs:
+            shutil.rmtree(directory)
+
+    def write(self, index, name, contents, mtime=None):
+        path = os.path.join(self.dirs[index], name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def get_engine(self):
+        engine = template.Engine(
+            dirs=self.dirs,
+            loaders=[('component_tags.loaders.IndexedLoader', ['django.template.loaders.filesystem.Loader'])],
+        )
+        loader = engine.template_loaders[0]
+        self.probed = []
+        get_template_sources = loader.loaders[0].get_template_sources
+
+        def spy(template_name):
+            self.probed.append(template_name)
+            return get_template_sources(template_name)
+        loader.loaders[0].get_template_sources = spy
+        return engine
+
+    def test_index(self):
+        with SettingsOverride(COMPONENT_TAGS_INDEXED_REFRESH=False):
+            engine = self.get_engine()
+            tpl = engine.get_template('components/cards/card.html')
+            self.assertIs(engine.get_template('components/cards/card.html'), tpl)
+            self.assertEqual(tpl.render(template.Context()), "first card")
+            self.assertEqual(engine.get_template('components/badge.html').render(template.Context()), "badge")
+            self.assertEqual(self.probed, [])
+
+            self.assertEqual(engine.get_template('page.html').render(template.Context()), "page")
+            self.assertEqual(self.probed, ['page.html'])
+            self.assertEqual(
+                sorted(engine.template_loaders[0].index),
+                ['components/badge.html', 'components/cards/card.html'],
+            )
+
+            # no refresh
+            self.write(0, 'components/cards/card.html', "changed", mtime=1)
+            self.assertIs(engine.get_template('components/cards/card.html'), tpl)
+
+    def test_refresh(self):
+        with SettingsOverride(COMPONENT_TAGS_INDEXED_REFRESH=True):
+            engine = self.get_engine()
+            tpl = engine.get_template('components/cards/card.html')
+            self.assertIs(engine.get_template('components/cards/card.html'), tpl)
+
+            self.write(0, 'components/cards/card.html', "changed", mtime=1)
+            self.assertEqual(engine.get_template('components/cards/card.html').render(template.Context()), "changed")
+
+            self.write(0, 'components/new.html', "new")
+            self.assertEqual(engine.get_template('components/new.html').render(template.Context()), "new")
+
+            os.remove(os.path.join(self.dirs[0], 'components/cards/card.html'))
+            self.assertEqual(
+                engine.get_template('components/cards/card.html').render(template.Context()), "second card"
+            )
+            self.assertEqual(self.probed, [])
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from django import template
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from component_tags import arguments, core
+from component_tags.memo import MemoMiddleware, get_memo, memo_scope
+
+from .context_managers import TemplateTags
+
+
+class ComponentTagMemoTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        calls = self.calls
+
+        class TestTag(core.Tag):
+            name = "test"
+            memoize = True
+            options = core.Options(
+                arguments.Argument('myarg'),
+                blocks=[('endtest', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                calls.append(kwargs['myarg'])
+                return "{}:{};".format(kwargs['myarg'], kwargs['content'])
+
+        self.TestTag = TestTag
+        with TemplateTags(TestTag):
+            self.tpl = template.Template(
+                "{% for i in items %}{% test i %}{{ i }}{% endtest %}{% test i %}-{% endtest %}{% endfor %}"
+            )
+
+    def test_memo_scope(self):
+        with memo_scope() as memo:
+            output = self.tpl.render(template.Context({'items': [1, 2, 1]}))
+        self.assertEqual(output, "1:1;1:-;2:2;2:-;1:1;1:-;")
+        self.assertEqual(self.calls, [1, 1, 2, 2])
+        self.assertEqual(memo.hits['test'], 2)
+        self.assertEqual(memo.misses['test'], 4)
+        self.assertIsNone(get_memo())
+
+    def test_for_tag(self):
+        with TemplateTags(self.TestTag.for_tag()):
+            tpl = template.Template("{% test_for items as i i %}{{ i }}{% endtest %}")
+        with memo_scope() as memo:
+            output = tpl.render(template.Context({'items': [1, 2, 1]}))
+        self.assertEqual(output, "1:1;2:2;1:1;")
+        self.assertEqual(self.calls, [1, 2])
+        self.assertEqual(memo.hits['test_for'], 1)
+
+    def test_without_memo_scope(self):
+        self.tpl.render(template.Context({'items': [1, 1]}))
+        self.assertEqual(self.calls, [1, 1, 1, 1])
+
+    def test_unhashable_arguments(self):
+        with memo_scope() as memo:
+            output = self.tpl.render(template.Context({'items': [[1], [1]]}))
+        self.assertEqual(output, "[1]:[1];[1]:-;[1]:[1];[1]:-;")
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(sum(memo.hits.values()), 0)
+
+    def test_equal_arguments_of_other_types(self):
+        with memo_scope() as memo:
+            output = self.tpl.render(template.Context({'items': [1, True, 1.0, 1]}))
+        self.assertEqual(output, "1:1;1:-;True:True;True:-;1.0:1.0;1.0:-;1:1;1:-;")
+        self.assertEqual(memo.misses['test'], 6)
+
+    def test_middleware(self):
+        def view(request):
+            return HttpResponse(self.tpl.render(template.Context({'items': [1, 1]})))
+
+        request = RequestFactory().get('/')
+        response = MemoMiddleware(view)(request)
+        self.assertEqual(response.content, b"1:1;1:-;1:1;1:-;")
+        self.assertEqual(request.component_memo.hits['test'], 2)
+        self.assertIsNone(get_memo())
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import threading
+from unittest import TestCase
+
+from django import template
+
+from component_tags import arguments, core
+
+from .context_managers import SettingsOverride, TemplateTags
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+class ComponentTagParallelTests(TestCase):
+
+    def get_tag(self, barrier=None):
+        running = {'current': 0, 'max': 0}
+        lock = threading.Lock()
+
+        class TestTag(core.Tag):
+            name = "test"
+            parallel = True
+            options = core.Options(
+                arguments.Argument('myarg'),
+            )
+
+            def render_tag(self, context, **kwargs):
+                with lock:
+                    running['current'] += 1
+                    running['max'] = max(running['max'], running['current'])
+                if barrier is not None:
+                    barrier.wait(timeout=5)
+                with lock:
+                    running['current'] -= 1
+                return "{}:{};".format(kwargs['myarg'], request_id.get())
+
+        return TestTag, running
+
+    def render(self, tag, source, ctx=None):
+        with TemplateTags(tag):
+            tpl = template.Template("{% load component_tags %}" + source)
+        return tpl.render(template.Context(ctx or {}))
+
+    def test_render_parallel_siblings(self):
+        TestTag, running = self.get_tag(threading.Barrier(3))
+        token = request_id.set('req')
+        try:
+            output = self.render(
+                TestTag,
+                "{% parallel %}{% test 1 %}-{% test foo %}-{% test 3 %}{% endparallel %}",
+                {'foo': 2},
+            )
+        finally:
+            request_id.reset(token)
+        self.assertEqual(output, "1:req;-2:req;-3:req;")
+        self.assertEqual(running['max'], 3)
+
+    def test_render_parallel_limit(self):
+        TestTag, running = self.get_tag()
+        with SettingsOverride(COMPONENT_TAGS_PARALLEL_LIMIT=1):
+            output = self.render(TestTag, "{% parallel %}{% test 1 %}{% test 2 %}{% test 3 %}{% endparallel %}")
+        self.assertEqual(output, "1:None;2:None;3:None;")
+        self.assertEqual(running['max'], 1)
+
+    def test_render_parallel_disabled(self):
+        TestTag, running = self.get_tag()
+        with SettingsOverride(COMPONENT_TAGS_PARALLEL_WORKERS=0):
+            output = self.render(TestTag, "{% parallel %}{% test 1 %}{% test 2 %}{% endparallel %}")
+        self.assertEqual(output, "1:None;2:None;")
+        self.assertEqual(running['max'], 1)
+
+    def test_render_parallel_in_component_block(self):
+        TestTag, running = self.get_tag(threading.Barrier(2))
+
+        class WrapperTag(core.Tag):
+            name = "wrapper"
+            options = core.Options(blocks=[('endwrapper', 'content')])
+
+            def render_tag(self, context, **kwargs):
+                return "[{}]".format(kwargs['content'])
+
+        with TemplateTags(WrapperTag):
+            output = self.render(TestTag, "{% wrapper %}{% test 1 %}{% test 2 %}{% endwrapper %}")
+        self.assertEqual(output, "[1:None;2:None;]")
+        self.assertEqual(running['max'], 2)
+
+    def test_render_parallel_in_loop(self):
+        TestTag, running = self.get_tag(threading.Barrier(3))
+        output = self.render(
+            TestTag,
+            "{% parallel %}{% for i in items %}{% if i %}{% with j=i %}"
+            "{{ forloop.counter }}{% test j %}{% endwith %}{% endif %}{% endfor %}"
+            "{% filter upper %}{% test 'x' %}{% endfilter %}{% endparallel %}",
+            {'items': ['a', 'b']},
+        )
+        # the filtered component renders in the request thread meanwhile
+        self.assertEqual(output, "1a:None;2b:None;X:NONE;")
+        self.assertEqual(running['max'], 3)
+
+    def test_render_parallel_limit_nested(self):
+        TestTag, running = self.get_tag()
+
+        class WrapperTag(core.Tag):
+            name = "wrapper"
+            options = core.Options(blocks=[('endwrapper', 'content')])
+
+            def render_tag(self, context, **kwargs):
+                return "[{}]".format(kwargs['content'])
+
+        with SettingsOverride(COMPONENT_TAGS_PARALLEL_LIMIT=2):
+            with TemplateTags(WrapperTag):
+                output = self.render(
+                    TestTag,
+                    "{% parallel %}{% test 1 %}{% for i in items %}{% wrapper %}{% test i %}{% test i %}{% endwrapper %}"
+                    "{% endfor %}{% endparallel %}",
+                    {'items': [2, 3]},
+                )
+        self.assertEqual(output, "1:None;[2:None;2:None;][3:None;3:None;]")
+        self.assertLessEqual(running['max'], 2)
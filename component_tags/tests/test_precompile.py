@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+from io import StringIO
+from unittest import TestCase, mock
+
+from django import template
+from django.core.management import call_command
+
+from component_tags import arguments, core, exceptions, freeze, parser, precompile, warmup
+from component_tags.registry import ComponentRegistry
+
+from .context_managers import TemplateTags
+
+
+class ComponentTagWarmupTests(TestCase):
+
+    def test_discover_templates(self):
+        names = precompile.discover_templates(template.Engine.get_default())
+        self.assertIn('tests/foo.html', names)
+        self.assertIn('tests/arguments.html', names)
+
+    def test_warmup(self):
+        class TestTag(core.Tag):
+            class Media:
+                template = 'tests/foo.html'
+                css = []
+                js = []
+
+            name="test"
+
+        reports = warmup(template_names=['tests/foo.html', 'tests/missing.html'])
+        names = [report.name for report in reports]
+        self.assertEqual(names[:2], ['tests/foo.html', 'tests/missing.html'])
+        self.assertIsNone(reports[0].error)
+        self.assertIsInstance(reports[1].error, template.TemplateDoesNotExist)
+        self.assertIn('_template', TestTag.__dict__)
+
+    def test_dependencies_manifest(self):
+        class TestTag(core.Tag):
+            class Media:
+                template = 'tests/foo.html'
+                css = ['/foo.css']
+                js = []
+
+            name="test"
+
+        class OtherTestTag(core.Tag):
+            class Media:
+                template = 'tests/foo.html'
+                css = ['/bar.css']
+                js = []
+
+            name="othertest"
+            options = core.Options(blocks=[('endothertest', 'content')])
+
+        with TemplateTags(TestTag, OtherTestTag):
+            tpl = template.Template(
+                "{% load component_tags %}{% dependencies %}{% othertest %}{% test %}{% endothertest %}"
+            )
+        manifest = core.get_dependencies_manifest(tpl)
+        self.assertEqual(manifest, [OtherTestTag, TestTag])
+        self.assertIs(core.get_dependencies_manifest(tpl), manifest)
+
+        expected_output = "{}\n{}\n".format(
+            '<link href="/bar.css" type="text/css" rel="stylesheet" />',
+            '<link href="/foo.css" type="text/css" rel="stylesheet" />',
+        )
+        for i in range(2):
+            output = tpl.render(template.Context({}))
+            self.assertEqual(output, expected_output + "foo")
+
+    def test_dependencies_manifest_extends_include(self):
+        class TestTag(core.Tag):
+            class Media:
+                template = 'tests/foo.html'
+                css = ['/foo.css']
+                js = []
+
+            name="test"
+
+        class OtherTestTag(core.Tag):
+            class Media:
+                css = ['/bar.css']
+                js = []
+
+            name="othertest"
+
+            def render_tag(self, context, **kwargs):
+                return "bar"
+
+        library = template.Library()
+        library.tag(TestTag)
+        library.tag(OtherTestTag)
+        engine = template.Engine(
+            loaders=[('django.template.loaders.locmem.Loader', {
+                'base.html': "{% load component_tags %}{% dependencies %}{% block content %}{% endblock %}"
+                             "{% include 'footer.html' %}{% include footer %}"
+                             "{% if missing %}{% include 'missing.html' %}{% endif %}",
+                'page.html': "{% extends 'base.html' %}{% block content %}{% test %}{% endblock %}",
+                'footer.html': "{% othertest %}",
+            })],
+            libraries={'component_tags': 'component_tags.templatetags.component_tags'},
+        )
+        engine.template_builtins.append(library)
+        tpl = engine.get_template('page.html')
+
+        self.assertEqual(core.get_dependencies_manifest(tpl), [TestTag, OtherTestTag])
+        output = tpl.render(template.Context({'footer': 'footer.html'}))
+        self.assertEqual(output, "{}\n{}\nfoobarbar".format(
+            '<link href="/bar.css" type="text/css" rel="stylesheet" />',
+            '<link href="/foo.css" type="text/css" rel="stylesheet" />',
+        ))
+
+
+class ComponentTagFreezeTests(TestCase):
+
+    def test_freeze_options(self):
+        options = core.Options(
+            arguments.Argument('myarg'),
+            arguments.KeywordArgument('mykwarg', required=False),
+            blocks=[('middle', 'before'), ('endtest', 'after')],
+        )
+        options.freeze()
+        self.assertIsInstance(options.arguments, tuple)
+        self.assertIsInstance(options.blocks, tuple)
+        with self.assertRaises(exceptions.FrozenError):
+            options.arguments = ()
+        with self.assertRaises(exceptions.FrozenError):
+            options.arguments[0].required = False
+
+        class TestTag(core.Tag):
+            name = "test"
+
+            def render_tag(self, context, **kwargs):
+                return "{}: {} / {}".format(kwargs['myarg'], kwargs['before'], kwargs['after'])
+        TestTag.options = options
+
+        with TemplateTags(TestTag):
+            tpl = template.Template("{% test 1 %}a{% middle %}b{% endtest %}")
+        self.assertEqual(tpl.render(template.Context({})), "1: a / b")
+
+    def test_freeze_registry(self):
+        class TestTag(core.Tag):
+            name = "test"
+
+        class OtherTestTag(core.Tag):
+            name = "othertest"
+
+        component_registry = ComponentRegistry()
+        component_registry.register(TestTag)
+        component_registry.freeze()
+        component_registry.register(TestTag)
+        with self.assertRaises(exceptions.FrozenError):
+            component_registry.register(OtherTestTag)
+        with self.assertRaises(exceptions.FrozenError):
+            component_registry.clear()
+
+    def test_freeze(self):
+        class TestTag(core.Tag):
+            name = "test_freeze"
+            options = core.Options()
+
+        component_registry = ComponentRegistry()
+        # only the local component: the options of the other imported
+        # components (core.Tag included) stay unfrozen for the other tests
+        with mock.patch.object(precompile, 'registry', component_registry):
+            with mock.patch.object(precompile, 'get_component_classes', return_value=[TestTag]):
+                freeze(gc_freeze=False)
+        self.assertIs(component_registry._registry['test_freeze'], TestTag)
+        self.assertTrue(component_registry.frozen)
+        self.assertTrue(TestTag.options._frozen)
+        self.assertFalse(getattr(core.Tag.options, '_frozen', False))
+
+
+class ComponentTagParseReportTests(TestCase):
+
+    def setUp(self):
+        class SectionTag(core.Tag):
+            name = "report_section"
+            options = core.Options(
+                arguments.Argument('title'),
+                arguments.KeywordArgument('level', required=False),
+                blocks=[('endreport_section', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                return kwargs['content']
+
+        class CardTag(core.Tag):
+            class Media:
+                template = 'tests/arguments.html'
+                css = []
+                js = []
+
+            name = "report_card"
+            options = core.Options(
+                arguments.Argument('myarg'),
+            )
+
+        self.tags = (SectionTag, CardTag)
+
+    def test_timed_parsing(self):
+        with TemplateTags(*self.tags):
+            with parser.timed_parsing() as timings:
+                tpl = template.Template(
+                    "{% report_section 'a' level=1 %}{% report_card x %}{% report_card y %}{% endreport_section %}"
+                )
+        section, card = timings.tags['report_section'], timings.tags['report_card']
+        self.assertEqual((section.count, card.count), (1, 2))
+        self.assertGreater(section.compile_filter_seconds, 0)
+        self.assertLessEqual(section.compile_filter_seconds, section.kwargs_seconds)
+        self.assertGreaterEqual(section.blocks_seconds, 0)
+
+        nodes, depth = precompile.measure_nodelist(tpl.nodelist)
+        # section + 2 cards, each card template holding 6 nodes
+        self.assertEqual(nodes, 3 + 2 * 6)
+        self.assertEqual(depth, 2)
+
+    def test_parse_report(self):
+        reports = precompile.parse_report(template_names=['tests/arguments.html', 'tests/missing.html'])
+        self.assertEqual(reports[0].name, 'tests/arguments.html')
+        self.assertEqual((reports[0].nodes, reports[0].depth, reports[0].cost), (6, 0, 6))
+        self.assertIsInstance(reports[1].error, template.TemplateDoesNotExist)
+
+    def test_parse_report_reads_sources(self):
+        engine = template.Engine.get_default()
+        with mock.patch.object(engine, 'find_template', side_effect=AssertionError) as find_template:
+            reports = precompile.parse_report(template_names=['tests/arguments.html'])
+        self.assertFalse(find_template.called)
+        self.assertIsNone(reports[0].error)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('component_parse_report', 'tests/arguments.html', '--sort', 'cost', stdout=stdout)
+        self.assertIn('tests/arguments.html', stdout.getvalue())
+        self.assertIn('total, 1 templates', stdout.getvalue())
+
+
+class ComponentTagMemoryReportTests(TestCase):
+
+    def setUp(self):
+        class SmallTag(core.Tag):
+            name = "memory_small"
+            options = core.Options(
+                arguments.Argument('myarg'),
+                blocks=[('endmemory_small', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                return kwargs['content']
+
+        class LargeTag(core.Tag):
+            name = "memory_large"
+            options = core.Options(
+                *[arguments.KeywordArgument('arg%s' % i, required=False) for i in range(8)]
+            )
+
+            def render_tag(self, context, **kwargs):
+                return ''
+
+        self.tags = (SmallTag, LargeTag)
+
+    def test_memory_report(self):
+        SmallTag, LargeTag = self.tags
+        with TemplateTags(*self.tags):
+            tpl = template.Template(
+                "{% memory_small 'a' %}" + "{% memory_large arg1=x|default:1 arg2='b' arg7=y %}" * 2 +
+                "{% endmemory_small %}"
+            )
+            core.get_dependencies_manifest(tpl)
+            reports = dict((report.component_class, report) for report in precompile.memory_report(templates=[tpl]))
+        small, large = reports[SmallTag], reports[LargeTag]
+        self.assertEqual((small.nodes, large.nodes), (1, 2))
+        self.assertGreater(large.value_bytes, small.value_bytes)
+        self.assertGreater(large.filter_bytes, small.filter_bytes)
+        # the block of small holds the large nodes, counted for LargeTag only
+        self.assertGreater(small.nodelist_bytes, 0)
+        self.assertLess(small.nodelist_bytes, large.bytes)
+        self.assertEqual(large.bytes, large.node_bytes + large.value_bytes + large.filter_bytes + large.nodelist_bytes)
+        self.assertEqual((small.registered, small.manifests), (1, 1))
+
+        with TemplateTags(*self.tags):
+            reports = precompile.memory_report(templates=[tpl, tpl])
+        # nodes are measured once
+        self.assertEqual([report.bytes for report in reports if report.component_class is LargeTag], [large.bytes])
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('component_memory_report', '--sort', 'nodes', '--limit', '1', stdout=stdout)
+        self.assertIn('components', stdout.getvalue())
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import TestCase
+
+from django import template
+
+from component_tags import arguments, core, profiling
+from component_tags.signals import component_rendered
+
+from .context_managers import TemplateTags
+
+
+class ComponentTagProfilingTests(TestCase):
+
+    def setUp(self):
+        profiling.reset()
+
+        class OuterTag(core.Tag):
+            name = "profile_outer"
+            options = core.Options(
+                blocks=[('endprofile_outer', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                time.sleep(0.01)
+                return "<%s>" % kwargs['content']
+
+        class InnerTag(core.Tag):
+            name = "profile_inner"
+            options = core.Options(
+                arguments.Argument('myarg'),
+            )
+
+            def render_tag(self, context, **kwargs):
+                time.sleep(0.02)
+                return kwargs['myarg']
+
+        self.outer = OuterTag
+        with TemplateTags(OuterTag, InnerTag):
+            self.tpl = template.Template(
+                "{% profile_outer %}{% profile_inner 'ab' %}{% profile_inner 'cd' %}{% endprofile_outer %}"
+            )
+
+    def test_disabled(self):
+        self.tpl.render(template.Context({}))
+        self.assertEqual(profiling.get_stats(), {})
+
+    def test_profile(self):
+        with profiling.profile():
+            self.assertTrue(profiling.instrumented)
+            self.assertEqual(self.tpl.render(template.Context({})), "<abcd>")
+        self.assertFalse(profiling.enabled)
+        self.assertFalse(profiling.instrumented)
+
+        stats = profiling.get_stats()
+        outer, inner = stats['profile_outer'], stats['profile_inner']
+        self.assertEqual((outer['calls'], inner['calls']), (1, 2))
+        self.assertEqual((outer['bytes'], inner['bytes']), (6, 4))
+        self.assertGreaterEqual(inner['seconds'], 0.04)
+        self.assertGreaterEqual(outer['seconds'], inner['seconds'] + 0.01)
+        self.assertLess(outer['self_seconds'], outer['seconds'] - 0.04)
+        self.assertGreaterEqual(outer['self_seconds'], 0.01)
+        self.assertLess(outer['resolve_seconds'], 0.01)
+
+    def test_signal(self):
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append((sender, kwargs['bytes']))
+
+        component_rendered.connect(receiver)
+        try:
+            with profiling.profile():
+                self.tpl.render(template.Context({}))
+        finally:
+            component_rendered.disconnect(receiver)
+        self.assertEqual([size for sender, size in received], [2, 2, 6])
+        self.assertIs(received[-1][0], self.outer)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from django import template
+
+from component_tags import arguments, core, utils
+from component_tags.registry import ComponentRegistry
+
+from .context_managers import TemplateTags
+
+NB_THREADS = 16
+NB_RENDERS = 400
+
+
+class ComponentTagStressTests(TestCase):
+    """
+    Many pages rendered from many threads must give the outputs and the
+    dependencies of a single-threaded render.
+    """
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        tags = []
+        for i in range(6):
+            media = type('Media', (object,), {
+                'template': 'tests/arguments.html' if i % 2 else None,
+                'css': ['/stress%s.css' % i],
+                'js': ['/stress%s.js' % (i % 3)],
+            })
+            attrs = {
+                'name': 'stress%s' % i,
+                'Media': media,
+                'options': core.Options(
+                    arguments.Argument('myarg'),
+                    arguments.KeywordArgument('mykwarg', required=False),
+                    blocks=[('endstress%s' % i, 'content')],
+                ),
+            }
+            if not i % 2:
+                attrs['render_tag'] = lambda self, context, **kwargs: '<%s:%s:%s>' % (
+                    self.name, kwargs['myarg'], kwargs['content']
+                )
+            tags.append(type(str('Stress%sTag' % i), (core.Tag,), attrs))
+
+        self.pages = []
+        with TemplateTags(*tags):
+            for page in range(12):
+                used = [i for i in range(6) if (page >> (i % 4)) & 1 or i == page % 6]
+                source = "{% load component_tags %}{% dependencies %}"
+                for i in used:
+                    source += "{%% stress%s item mykwarg=page %%}" % i
+                for i in reversed(used):
+                    source += "{%% endstress%s %%}" % i
+                self.pages.append((template.Template(source), set(used)))
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def render(self, index):
+        tpl, used = self.pages[index % len(self.pages)]
+        return tpl.render(template.Context({'item': index % 7, 'page': index % len(self.pages)}))
+
+    def test_concurrent_renders(self):
+        expected = [self.render(index) for index in range(NB_RENDERS)]
+        with ThreadPoolExecutor(NB_THREADS) as executor:
+            outputs = list(executor.map(self.render, range(NB_RENDERS)))
+        self.assertEqual(outputs, expected)
+
+        for index, output in enumerate(outputs):
+            used = self.pages[index % len(self.pages)][1]
+            # the stylesheets are only output by the dependencies tag
+            for i in range(6):
+                self.assertEqual('/stress%s.css' % i in output, i in used)
+
+    def test_concurrent_class_creation(self):
+        class TestTag(core.Tag):
+            name = "stress_mixin"
+
+        barrier = threading.Barrier(NB_THREADS)
+
+        def create(index):
+            barrier.wait()
+            return TestTag.for_tag(), utils.mixin(TestTag, core.ForTagMixin, attrs={'index': index % 2})
+
+        with ThreadPoolExecutor(NB_THREADS) as executor:
+            results = list(executor.map(create, range(NB_THREADS)))
+        self.assertEqual(len(set(for_tag for for_tag, mixed in results)), 1)
+        self.assertEqual(len(set(mixed for for_tag, mixed in results)), 2)
+
+    def test_concurrent_registry(self):
+        component_registry = ComponentRegistry()
+        classes = [type(str('RegistryTag%s' % i), (core.Tag,), {'name': 'stress_registry'}) for i in range(NB_THREADS)]
+        barrier = threading.Barrier(NB_THREADS)
+
+        def register(component_class):
+            barrier.wait()
+            component_registry.register(component_class)
+            return component_registry.get('stress_registry')
+
+        with ThreadPoolExecutor(NB_THREADS) as executor:
+            winners = set(executor.map(register, classes))
+        self.assertEqual(len(winners), 1)
+
+    def test_striped_counter(self):
+        counter = utils.StripedCounter()
+
+        def add(index):
+            for _ in range(1000):
+                counter.add('key')
+                counter.add(index % 3, 2)
+
+        with ThreadPoolExecutor(NB_THREADS) as executor:
+            list(executor.map(add, range(NB_THREADS)))
+        self.assertEqual(counter['key'], NB_THREADS * 1000)
+        self.assertEqual(sum(counter.snapshot().values()), NB_THREADS * 3000)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from django import template
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from component_tags import arguments, core, fragments, profiling, tracing
+
+from .context_managers import TemplateTags
+from .test_fragments import Product
+
+
+class ComponentTagTracingTests(TestCase):
+
+    def setUp(self):
+        fragments.get_cache().clear()
+
+        class SectionTag(core.Tag):
+            name = "trace_section"
+            options = core.Options(
+                arguments.Argument('title'),
+                blocks=[('endtrace_section', 'content')],
+            )
+
+            def render_tag(self, context, **kwargs):
+                return "<h1>%s</h1>%s" % (kwargs['title'], kwargs['content'])
+
+        class CardTag(core.Tag):
+            name = "trace_card"
+            cacheable = True
+            options = core.Options(
+                arguments.Argument('label'),
+            )
+
+            def render_tag(self, context, **kwargs):
+                return "[%s]" % kwargs['label']
+
+        with TemplateTags(SectionTag, CardTag):
+            self.tpl = template.Template(
+                "{% trace_section 'a' %}{% trace_card 'x' %}{% trace_card 'y' %}{% endtrace_section %}"
+            )
+
+    def test_disabled(self):
+        self.assertFalse(tracing.enabled)
+        with tracing.span('noop') as span:
+            self.assertIsNone(span)
+
+    def test_spans(self):
+        with tracing.trace() as exporter:
+            self.assertTrue(profiling.instrumented)
+            self.tpl.render(template.Context({}))
+        self.assertFalse(tracing.enabled)
+        self.assertFalse(profiling.instrumented)
+
+        [section] = exporter.roots
+        self.assertEqual(section.name, 'trace_section')
+        self.assertEqual(section.attributes['arguments'], {'title': "'a'", 'content': '<6 bytes>'})
+        self.assertEqual(section.attributes['bytes'], 16)
+        self.assertEqual([child.name for child in section.children], ['trace_card', 'trace_card'])
+        self.assertEqual([child.attributes['cache'] for child in section.children], ['miss', 'miss'])
+        self.assertGreaterEqual(section.seconds, sum(child.seconds for child in section.children))
+
+        with tracing.trace() as exporter:
+            self.tpl.render(template.Context({}))
+        self.assertEqual([child.attributes['cache'] for child in exporter.roots[0].children], ['hit', 'hit'])
+
+    def test_summarize(self):
+        self.assertEqual(tracing.summarize('a' * 50), "'" + 'a' * 36 + '...')
+        self.assertEqual(tracing.summarize([1, 2]), '<list: 2 items>')
+        self.assertEqual(tracing.summarize(Product(pk=3)), '<Product: pk=3>')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(tracing.summarize(Product.objects.all()), '<QuerySet>')
+        self.assertEqual(len(queries), 0)
+
+    def test_batch_spans(self):
+        with tracing.trace() as exporter:
+            with fragments.batch() as fragment_batch:
+                fragment_batch.splice(self.tpl.render(template.Context({})))
+        section, splice = exporter.roots
+        self.assertEqual([child.attributes['cache'] for child in section.children], ['batch', 'batch'])
+        self.assertEqual(splice.name, 'fragments.splice')
+        self.assertEqual([(child.name, child.attributes['cache']) for child in splice.children], [
+            ('trace_card', 'miss'), ('trace_card', 'miss'),
+        ])
+
+    def test_chrome_trace(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            with tracing.trace(tracing.ChromeTraceExporter(path)):
+                self.tpl.render(template.Context({}))
+            with open(path) as f:
+                events = json.load(f)['traceEvents']
+        finally:
+            os.remove(path)
+        self.assertEqual([event['name'] for event in events], ['trace_card', 'trace_card', 'trace_section'])
+        self.assertTrue(all(event['ph'] == 'X' and event['dur'] >= 0 for event in events))
+        self.assertEqual(events[-1]['args']['arguments']['title'], "'a'")
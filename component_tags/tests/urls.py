@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from django.urls import include, path
+
+urlpatterns = [
+    path('components/', include('component_tags.urls')),
+]
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from uuid import UUID
+
+from django.db.models import Model
+
+from . import profiling
+
+# see profiling.instrumented, checked by Tag.render
+enabled = False
+
+exporters = []
+_exporters_lock = threading.Lock()
+_span = contextvars.ContextVar('component_tags_span', default=None)
+
+ARGUMENT_MAX_LENGTH = 40
+# arguments summarized by their repr, cheap to compute
+REPR_TYPES = (str, bool, int, float, Decimal, UUID, datetime.date, datetime.time, datetime.timedelta)
+# arguments summarized by their length
+CONTAINER_TYPES = (list, tuple, dict, set, frozenset)
+
+
+class Span(object):
+    """
+    Render of a component, nested in the span of the component rendering it
+    (across blocks, templates and parallel threads).
+    """
+    __slots__ = ('name', 'parent', 'children', 'attributes', 'start', 'end', 'thread_id')
+
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread_id = threading.get_ident()
+        if parent is not None:
+            parent.children.append(self)
+
+    def __repr__(self):  # pragma: no cover
+        return '<Span: %s>' % self.name
+
+    @property
+    def seconds(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @property
+    def self_seconds(self):
+        return max(0.0, self.seconds - sum(child.seconds for child in self.children))
+
+    def finish(self):
+        self.end = time.perf_counter()
+        with _exporters_lock:
+            current_exporters = list(exporters)
+        for exporter in current_exporters:
+            exporter.export(self)
+
+
+class InMemoryExporter(object):
+    """
+    Keep the finished spans, e.g. for tests or a debug panel.
+    """
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    @property
+    def roots(self):
+        return [span for span in self.spans if span.parent is None]
+
+    def clear(self):
+        self.spans = []
+
+
+class ChromeTraceExporter(object):
+    """
+    Write the finished spans as Chrome trace events, to open with
+    chrome://tracing, Perfetto or speedscope:
+        with trace(ChromeTraceExporter('/tmp/page.json')) as exporter:
+            template.render(context)
+    The file is written by write(), called when the trace() block exits.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+        self.origin = time.perf_counter()
+
+    def export(self, span):
+        self.events.append({
+            'name': span.name,
+            'cat': 'component',
+            'ph': 'X',
+            'ts': (span.start - self.origin) * 1e6,
+            'dur': span.seconds * 1e6,
+            'pid': os.getpid(),
+            'tid': span.thread_id,
+            'args': dict(
+                (key, value if isinstance(value, (int, float, dict)) else str(value))
+                for key, value in span.attributes.items()
+            ),
+        })
+
+    def write(self):
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+def add_exporter(exporter):
+    global enabled
+    with _exporters_lock:
+        exporters.append(exporter)
+        enabled = True
+        profiling.update_instrumented(tracing=True)
+
+
+def remove_exporter(exporter):
+    global enabled
+    with _exporters_lock:
+        exporters.remove(exporter)
+        enabled = bool(exporters)
+        profiling.update_instrumented(tracing=enabled)
+
+
+@contextmanager
+def trace(exporter=None):
+    """
+    Trace the components rendered within the block:
+        with trace() as exporter:
+            html = template.render(context)
+        exporter.roots
+    """
+    exporter = exporter if exporter is not None else InMemoryExporter()
+    add_exporter(exporter)
+    try:
+        yield exporter
+    finally:
+        remove_exporter(exporter)
+        if hasattr(exporter, 'write'):
+            exporter.write()
+
+
+def get_current_span():
+    return _span.get()
+
+
+def annotate(**attributes):
+    """
+    Add attributes (e.g. the cache status) to the current span.
+    """
+    span = _span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Open a span within the block, when tracing is enabled.
+    """
+    if not enabled:
+        yield None
+        return
+    current = Span(name, _span.get(), **attributes)
+    token = _span.set(current)
+    try:
+        yield current
+    finally:
+        _span.reset(token)
+        current.finish()
+
+
+def summarize(value):
+    """
+    Short description of an argument, which must not evaluate it: lazy
+    values (QuerySet...) are described by their type only.
+    """
+    if value is None or isinstance(value, REPR_TYPES):
+        text = repr(value[:ARGUMENT_MAX_LENGTH] if isinstance(value, str) else value)
+    elif isinstance(value, Model):
+        # str() may query related objects
+        text = '<%s: pk=%s>' % (type(value).__name__, value.pk)
+    elif type(value) in CONTAINER_TYPES:
+        text = '<%s: %s items>' % (type(value).__name__, len(value))
+    else:
+        text = '<%s>' % type(value).__name__
+    if len(text) > ARGUMENT_MAX_LENGTH:
+        text = text[:ARGUMENT_MAX_LENGTH - 3] + '...'
+    return text
+
+
+def render(node, context):
+    """
+    Tag.render with tracing, and profiling when it is enabled too.
+    """
+    current = Span(node.name, _span.get())
+    token = _span.set(current)
+    try:
+        kwargs = node.get_render_kwargs(context)
+        resolve_seconds = current.self_seconds
+        arguments = current.attributes['arguments'] = {}
+        for key, value in kwargs.items():
+            if key in node.blocks:
+                arguments[key] = '<%s bytes>' % len(str(value).encode('utf-8'))
+            else:
+                arguments[key] = summarize(value)
+        output = node.render_kwargs(context, kwargs)
+        current.attributes['bytes'] = len(str(output).encode('utf-8'))
+    finally:
+        _span.reset(token)
+        current.finish()
+    if profiling.enabled:
+        profiling.record(node, current.seconds, current.self_seconds, resolve_seconds, output)
+    return output
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+from django.urls import path
+
+from . import views
+
+app_name = 'component_tags'
+
+urlpatterns = [
+    path('<str:name>/', views.component, name='component'),
+]
@@ -1,15 +1,22 @@
 # -*- coding: utf-8 -*-
+import itertools
 import re
+import threading
+from collections import Counter
 from copy import copy
 
 from django.utils import six
 
+from .exceptions import FrozenError
+
 
 class TemplateConstant(object):
     """
     A 'constant' internal template variable which basically allows 'resolving'
     returning it's initial value
     """
+    __slots__ = ('literal', 'value')
+
     def __init__(self, value):
         self.literal = value
         if isinstance(value, six.string_types):
@@ -31,6 +38,88 @@ class TemplateConstant(object):
                 return self.value
 
 
+class StaticVariable(object):
+    """
+    A variable resolving to a Python value, used for components rendered
+    without a template.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):  # pragma: no cover
+        return '<StaticVariable: %s>' % repr(self.value)
+
+    @property
+    def literal(self):
+        return repr(self.value)
+
+    def resolve(self, context):
+        return self.value
+
+
+class Freezable(object):
+    """
+    Object rejecting attribute changes once frozen.
+    """
+    __slots__ = ()
+
+    def freeze(self):
+        object.__setattr__(self, '_frozen', True)
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise FrozenError("%r is frozen, %s can not be changed" % (self, name))
+        super(Freezable, self).__setattr__(name, value)
+
+
+class StripedCounter(object):
+    """
+    Counter shared by threads. Each thread updates one of several stripes,
+    each with its own lock, so that threads rarely wait for each other (no
+    global lock, also on free-threaded Python builds). Reads sum the stripes.
+    """
+    STRIPES = 16
+
+    def __init__(self):
+        self._stripes = [(threading.Lock(), Counter()) for _ in range(self.STRIPES)]
+        self._local = threading.local()
+        self._stripe_ids = itertools.count()
+
+    def _stripe(self):
+        index = getattr(self._local, 'index', None)
+        if index is None:
+            index = self._local.index = next(self._stripe_ids) % self.STRIPES
+        return self._stripes[index]
+
+    def add(self, key, value=1):
+        lock, counter = self._stripe()
+        with lock:
+            counter[key] += value
+
+    def __getitem__(self, key):
+        total = 0
+        for lock, counter in self._stripes:
+            with lock:
+                total += counter.get(key, 0)
+        return total
+
+    def snapshot(self):
+        """
+        Return a Counter holding the sums.
+        """
+        total = Counter()
+        for lock, counter in self._stripes:
+            with lock:
+                total.update(counter)
+        return total
+
+    def clear(self):
+        for lock, counter in self._stripes:
+            with lock:
+                counter.clear()
+
 
 def get_default_name(name):
     """
@@ -41,10 +130,23 @@ def get_default_name(name):
     return _re2.sub(r'\1_\2', _re1.sub(r'\1_\2', name)).lower()
 
 
+_mixins = {}
+
+
 def mixin(parent, child, attrs=None):
+    """
+    Return a class inheriting from child and parent. Classes are built once
+    for the same arguments, and can be pickled through their _mixin_args.
+    """
     attrs = attrs or {}
-    return type(
-        '%sx%s' % (parent.__name__, child.__name__),
-        (child, parent),
-        attrs
-    )
+    key = (parent, child, repr(sorted(attrs.items())))
+    klass = _mixins.get(key)
+    if klass is None:
+        class_attrs = dict(attrs, _mixin_args=(parent, child, attrs))
+        klass = type(
+            '%sx%s' % (parent.__name__, child.__name__),
+            (child, parent),
+            class_attrs
+        )
+        klass = _mixins.setdefault(key, klass)
+    return klass
@@ -9,17 +9,21 @@ from .exceptions import TemplateSyntaxWarning
 
 
 class Value(object):
+    __slots__ = ('var',)
     errors = {}
     value_on_error = ""
 
     def __init__(self, var):
         self.var = var
+
+    @property
+    def literal(self):
         try:
             # django.template.base.Variable
-            self.literal = self.var.literal
+            return self.var.literal
         except AttributeError:
             # django.template.base.FilterExpression
-            self.literal = self.var.token
+            return self.var.token
 
     def resolve(self, context):
         resolved = self.var.resolve(context)
@@ -43,6 +47,7 @@ class Value(object):
 
 
 class StringValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s could not be converted to string",
     }
@@ -56,6 +61,7 @@ class StringValue(Value):
 
 
 class StrictStringValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s is not a string",
     }
@@ -68,6 +74,7 @@ class StrictStringValue(Value):
 
 
 class IntegerValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s could not be converted to Integer",
     }
@@ -81,6 +88,7 @@ class IntegerValue(Value):
 
 
 class BooleanValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s could not be converted to Boolean",
     }
@@ -94,6 +102,7 @@ class BooleanValue(Value):
 
 
 class FloatValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s could not be converted to Boolean",
     }
@@ -107,6 +116,7 @@ class FloatValue(Value):
 
 
 class IterableValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s is not iterable",
     }
@@ -122,6 +132,7 @@ class IterableValue(Value):
 
 
 class ListValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s is not a list",
     }
@@ -135,6 +146,7 @@ class ListValue(Value):
 
 
 class DictValue(Value):
+    __slots__ = ()
     errors = {
         "clean": "%(value)s is not a dictionnary",
     }
@@ -148,6 +160,7 @@ class DictValue(Value):
 
 
 class ChoiceValue(Value):
+    __slots__ = ()
     errors = {
         "choice": "%(value)s is not a valid choice. Valid choices: "
                   "%(choices)s.",
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import hashlib
+
+from django.core import signing
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.template import RequestContext, engines
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+
+from . import deferred, fragments
+from .precompile import get_component_classes
+
+# component name -> deferred component class
+_component_classes = {}
+
+
+def get_component_class(name):
+    """
+    Return the deferred component class named name. The class is looked up
+    in the imported components, not in the registry which only holds the
+    components parsed by the process so far.
+    """
+    component_class = _component_classes.get(name)
+    if component_class is None:
+        # the template libraries of the engines define their components
+        engines.all()
+        for klass in get_component_classes():
+            if klass.deferred:
+                _component_classes[klass.name] = klass
+        component_class = _component_classes.get(name)
+    return component_class
+
+
+@require_GET
+def component(request, name):
+    """
+    Render the deferred component name with the arguments signed in the 'a'
+    parameter. Cacheable components are read from the fragment cache and
+    the response is revalidated with its ETag.
+    """
+    component_class = get_component_class(name)
+    if component_class is None:
+        raise Http404("No deferred component named '%s'" % name)
+    try:
+        kwargs = deferred.load_kwargs(name, request.GET.get('a', ''))
+    except signing.BadSignature:
+        return HttpResponseBadRequest()
+    except ObjectDoesNotExist:
+        raise Http404("An argument of the component '%s' does not exist anymore" % name)
+
+    node = component_class.new_node()
+    with fragments.batch() as fragment_batch:
+        output = fragment_batch.splice(node.render_resolved(RequestContext(request), kwargs))
+
+    etag = '"%s"' % hashlib.md5(output.encode('utf-8')).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(output)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=0)
+    return response